@@ -4,68 +4,600 @@
 # In[ ]:
 
 
-from flask import Flask, request, jsonify
-import pandas as pd
-from zipfile import ZipFile
-import joblib
-import requests
-import io
+from flask import Blueprint, Flask, current_app, g, request, jsonify
+import numpy as np
+import json
+import os
+import threading
+import time
+from functools import lru_cache
 
-app = Flask(__name__)
+import config
+from feature_store import data_version, load_features, load_raw
+from id_index import IdIndex
+from tree_engine import make_predictor
+from score_table import load_score_table, table_version
+from explain import load_explainer
+from batcher import MicroBatcher, Overloaded
+from drift import load_monitor
+from neighbors import load_neighbor_index
+from population import build_population_stats
+from simulation import ThresholdSweep, parse_perturbation, score_variants, threshold_grid
+from scoring import SEUIL, decision
+from model_registry import get_registry
+from serialization import RowEncoder, encode, negotiate
+from metrics import REGISTRY, REQUESTS, REQUEST_SECONDS, SamplingProfiler, instrument_predictor, stage
 
-# Charger les données et le modèle en cache
+api = Blueprint("api", __name__)
+
+# Nombre de lignes envoyées à predict_proba en une fois pour les prédictions groupées
+BATCH_CHUNK_SIZE = int(os.environ.get("SCORING_BATCH_CHUNK_SIZE", 5000))
+# Nombre maximal d'éléments acceptés dans une requête groupée
+MAX_BATCH_SIZE = int(os.environ.get("SCORING_MAX_BATCH_SIZE", 100000))
+# Nombre maximal de contributions SHAP renvoyées par client
+MAX_TOP_K = 100
+# Nombre maximal de seuils et de variantes d'une simulation
+MAX_THRESHOLDS = 1001
+MAX_VARIANTS = 100
+# Nombre maximal de clients similaires renvoyés
+MAX_NEIGHBORS = 100
+# Taille maximale d'une page de /api/clients
+MAX_PAGE_SIZE = int(os.environ.get("SCORING_MAX_PAGE_SIZE", 10000))
+
+# Charger les données (magasin binaire mappé en mémoire, sinon CSV) ; le modèle vient du registre
 def load_data():
-    data_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/X_test.zip"
-    response = requests.get(data_url)
-    with io.BytesIO(response.content) as zip_file:
-        with ZipFile(zip_file, "r") as z:
-            data = pd.read_csv(z.open('X_test.csv'), index_col='SK_ID_CURR', encoding='utf-8')
-            available_ids = data.index.tolist()
-            return data, available_ids
-            
-def load_raw_data():    
-    data_brut_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/X_test_brut.zip"
-    response = requests.get(data_brut_url)
-    with io.BytesIO(response.content) as zip_file:
-        with ZipFile(zip_file, "r") as z:
-            raw_data = pd.read_csv(z.open('X_test_brut.csv'), index_col='SK_ID_CURR', encoding='utf-8')
-            return raw_data
-
-def load_model():
-    model_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/modele_lgbm_over.pkl"
-    response = requests.get(model_url)
-    model = joblib.load(io.BytesIO(response.content))
-    return model
-    
-data, available_ids = load_data()
-raw_data = load_raw_data()
-model = load_model()
-
-# Point API pour fournir la liste des ID clients
-@app.route('/api/clients', methods=['GET'])
+    data = load_features()
+    available_ids = data.index.tolist()
+    return data, available_ids
+
+def load_raw_data():
+    raw_data = load_raw()
+    return raw_data
+
+# État partagé par toutes les requêtes : données, modèle et précalculs.
+# Construit une seule fois ; avec gunicorn --preload il l'est dans le processus
+# maître puis partagé en copie sur écriture par tous les workers.
+class ScoringState:
+    def __init__(self, data, raw_data, model, version, model_info=None, data_checksum=None):
+        self.data = data
+        self.available_ids = data.index.tolist()
+        self.raw_data = raw_data
+        self.model = model
+        self.model_info = model_info or {}
+        # Fonction de prédiction selon le moteur configuré (SCORING_INFERENCE_BACKEND)
+        self.predict_positive = instrument_predictor(make_predictor(model, config.INFERENCE_BACKEND))
+        # Regroupement des prédictions concurrentes en un seul appel au modèle (SCORING_MICROBATCH=1)
+        self.batcher = MicroBatcher(self.predict_positive, config.MICROBATCH_MAX_ROWS, config.MICROBATCH_WAIT,
+                                    config.MICROBATCH_MAX_QUEUE) if config.MICROBATCH else None
+        # Matrice des features pour un accès positionnel direct (vue sans copie quand le type est homogène)
+        self.features = data.to_numpy()
+        self.data_index = IdIndex(data.index)
+        self.raw_index = IdIndex(raw_data.index)
+        # TARGET de chaque ligne de X_test (même ordre que la matrice), NaN si inconnue
+        self.targets = self._targets(data, raw_data)
+        # Encodeurs des lignes brutes et prétraitées (colonnes préparées une fois)
+        self.raw_encoder = RowEncoder(raw_data)
+        self.features_encoder = RowEncoder(data)
+        # Version commune des précalculs : empreintes du modèle et des données
+        self.version = version
+        # Scores précalculés de tous les clients de X_test
+        self.score_table = load_score_table(self.predict_positive, data, SEUIL, BATCH_CHUNK_SIZE, version=self.version) if config.SCORE_TABLE else None
+        # Explainer SHAP unique, avec les contributions précalculées lorsqu'elles existent
+        self.explainer = load_explainer(model, data, self.version, precompute=config.SHAP_PRECOMPUTE)
+        # Précalculs sur les scores de tout le portefeuille (statistiques de population,
+        # balayage des seuils) : construits dès maintenant avec la table des scores,
+        # sinon au premier usage, pour que SCORING_SCORE_TABLE=0 n'impose pas un scoring
+        # complet de X_test au démarrage
+        self._portfolio = {}
+        self._portfolio_lock = threading.RLock()
+        if self.score_table is not None:
+            self.build_portfolio()
+        # Suivi de la dérive des features et des scores servis par rapport à X_test, construit
+        # avant le fork ; le portefeuille n'est scoré que si le profil de référence n'existe pas
+        self.drift = load_monitor(data, lambda: self.probabilities, SEUIL, self.version) if config.DRIFT else None
+        # Index des clients similaires, ne dépendant que des données
+        self.neighbors = load_neighbor_index(data, data_checksum or version) if config.SIMILAR else None
+        # Liste complète des ID sérialisée une seule fois
+        self.clients_payload = json.dumps({"available_ids": self.available_ids})
+        self.clients_page = lru_cache(maxsize=256)(self._clients_page)
+
+    # Précalcul du portefeuille construit une seule fois, au premier accès
+    def _portfolio_value(self, name, build):
+        if name not in self._portfolio:
+            with self._portfolio_lock:
+                if name not in self._portfolio:
+                    self._portfolio[name] = build()
+        return self._portfolio[name]
+
+    # Construit tous les précalculs du portefeuille (avant le fork des workers avec --preload)
+    def build_portfolio(self):
+        return self.population, self.portfolio_sweep
+
+    # Scores de tous les clients : ceux de la table ou, à défaut, un scoring complet
+    @property
+    def probabilities(self):
+        if self.score_table is not None:
+            return self.score_table.probabilities
+        return self._portfolio_value("probabilities", lambda: self.predict_proba_chunked(self.features))
+
+    # Statistiques de population (montants, âge, score) par groupe de décision
+    @property
+    def population(self):
+        return self._portfolio_value("population", lambda: build_population_stats(
+            self.raw_data, self.data, self.probabilities, SEUIL, self.version))
+
+    # Balayage des seuils sur tout le portefeuille (scores triés une fois)
+    @property
+    def portfolio_sweep(self):
+        return self._portfolio_value("portfolio_sweep", lambda: ThresholdSweep(self.probabilities, self.targets))
+
+    @classmethod
+    def load(cls):
+        data, _ = load_data()
+        return cls.for_model(data, load_raw_data(), get_registry().current())
+
+    # État construit pour une version du registre de modèles
+    @classmethod
+    def for_model(cls, data, raw_data, model_version):
+        data_checksum = data_version()
+        version = table_version(model_version.checksum, data_checksum)
+        return cls(data, raw_data, model_version.model, version, model_info=model_version.metadata(),
+                   data_checksum=data_checksum)
+
+    @staticmethod
+    def _targets(data, raw_data):
+        if "TARGET" not in raw_data.columns:
+            return np.full(len(data), np.nan)
+        return raw_data["TARGET"].reindex(data.index).to_numpy(dtype=np.float64)
+
+    # Prédiction vectorisée par paquets de chunk_size lignes
+    def predict_proba_chunked(self, X, chunk_size=BATCH_CHUNK_SIZE):
+        probas = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), chunk_size):
+            probas[start:start + chunk_size] = self.predict_positive(X[start:start + chunk_size])
+        return probas
+
+    # Prédiction en direct : les petits lots passent par le micro-batching s'il est actif
+    def score_rows(self, X, chunk_size=BATCH_CHUNK_SIZE):
+        if self.batcher is not None and len(X) <= self.batcher.max_rows:
+            return self.batcher.predict_rows(X, timeout=config.MICROBATCH_TIMEOUT)
+        return self.predict_proba_chunked(X, chunk_size)
+
+    def _clients_page(self, page, per_page):
+        start = (page - 1) * per_page
+        return json.dumps({
+            "available_ids": self.available_ids[start:start + per_page],
+            "page": page,
+            "per_page": per_page,
+            "total": len(self.available_ids),
+        })
+
+def create_app(state=None):
+    app = Flask(__name__)
+    app.extensions["scoring"] = state or ScoringState.load()
+    app.extensions["profiler"] = SamplingProfiler(config.PROFILER_INTERVAL) if config.PROFILER else None
+    # Remplacement à chaud : un nouvel état est construit pour le nouveau modèle puis
+    # substitué d'un bloc ; les requêtes en cours terminent avec l'ancien
+    app.extensions["model_registry"] = None
+    if state is None:
+        registry = get_registry()
+        app.extensions["model_registry"] = registry
+
+        def swap_model(model_version):
+            previous = app.extensions["scoring"]
+            # Les features compactées n'ont été vérifiées en float32 qu'avec l'ancien modèle :
+            # elles sont rechargées, ce qui reconstruit le magasin (vérification comprise)
+            # pour le nouveau modèle
+            data = load_data()[0] if config.COMPACT else previous.data
+            app.extensions["scoring"] = ScoringState.for_model(data, previous.raw_data, model_version)
+            if previous.batcher is not None:
+                previous.batcher.close()
+            if previous.drift is not None:
+                previous.drift.close()
+        registry.subscribe(swap_model)
+    app.before_request(start_request_timer)
+    app.after_request(record_status)
+    app.teardown_request(record_request)
+    app.register_blueprint(api)
+    return app
+
+def start_request_timer():
+    # Le profileur démarre dans chaque worker (un thread ne survit pas au fork de gunicorn)
+    profiler = current_app.extensions["profiler"]
+    if profiler is not None and not profiler.running:
+        profiler.start()
+    registry = current_app.extensions["model_registry"]
+    if registry is not None:
+        registry.ensure_watching()
+    g.request_start = time.perf_counter()
+
+def record_status(response):
+    g.response_status = response.status_code
+    return response
+
+# Appelé à la fin de chaque requête, même si une exception non gérée a empêché
+# after_request (erreur 500 propagée au serveur WSGI)
+def record_request(exc):
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    status = 500 if exc is not None else g.get("response_status", 500)
+    REQUESTS.inc(endpoint, str(status))
+    if "request_start" in g:
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, endpoint)
+
+def get_state():
+    return current_app.extensions["scoring"]
+
+# File du micro-batching saturée : le client est invité à réessayer
+@api.errorhandler(Overloaded)
+def overloaded(e):
+    response = jsonify({"error": f"Scoring queue saturated, retry later ({e})"})
+    response.status_code = 503
+    response.headers["Retry-After"] = "1"
+    return response
+
+# Conversion d'une ligne brute (dict par nom de colonne ou liste ordonnée) en vecteur de features
+def row_to_features(row, columns):
+    if isinstance(row, dict):
+        unknown = set(row) - set(columns)
+        if unknown:
+            raise ValueError(f"Unknown features: {sorted(unknown)}")
+        return [np.nan if row.get(col) is None else float(row[col]) for col in columns]
+    if isinstance(row, list):
+        if len(row) != len(columns):
+            raise ValueError(f"Expected {len(columns)} features, got {len(row)}")
+        return [np.nan if value is None else float(value) for value in row]
+    raise ValueError("Row must be an object or a list")
+
+# Réponse encodée selon l'en-tête Accept (JSON par défaut, msgpack sur demande)
+def respond(obj, status=200):
+    mimetype = negotiate(request.accept_mimetypes)
+    return current_app.response_class(encode(obj, mimetype), status=status, mimetype=mimetype)
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Point API pour fournir la liste des ID clients (paginée avec ?page=&per_page=)
+@api.route('/api/clients', methods=['GET'])
 def get_clients():
-    return jsonify({"available_ids": available_ids})
+    state = get_state()
+    if "page" not in request.args and "per_page" not in request.args:
+        return current_app.response_class(state.clients_payload, mimetype="application/json")
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", 1000, type=int)
+    if page < 1 or not 1 <= per_page <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"'page' must be >= 1 and 'per_page' between 1 and {MAX_PAGE_SIZE}"}), 400
+    return current_app.response_class(state.clients_page(page, per_page), mimetype="application/json")
 
 # Point API pour fournir les données d'un client (ID)
-@app.route('/api/client/<int:id>', methods=['GET'])
+@api.route('/api/client/<int:id>', methods=['GET'])
 def get_client_data(id):
-    if id in available_ids:
-        client_raw_data = raw_data.loc[id].to_dict()
-        return jsonify(client_raw_data)
+    state = get_state()
+    with stage("lookup"):
+        position = state.raw_index.position(id)
+    if position is not None:
+        # Ligne encodée directement depuis les tableaux des colonnes (JSON, msgpack ou Arrow)
+        mimetype = negotiate(request.accept_mimetypes, tabular=True)
+        with stage("serialize"):
+            body = state.raw_encoder.encode(position, mimetype)
+        return current_app.response_class(body, mimetype=mimetype)
     else:
         return jsonify({"error": "Client ID not found"}), 404
 
+# Point API pour fournir les données prétraitées d'un client (ID), telles que vues par le modèle
+@api.route('/api/client_preprocessed/<int:id>', methods=['GET'])
+def get_client_preprocessed_data(id):
+    state = get_state()
+    with stage("lookup"):
+        position = state.data_index.position(id)
+    if position is None:
+        return jsonify({"error": "Client ID not found"}), 404
+    mimetype = negotiate(request.accept_mimetypes, tabular=True)
+    with stage("serialize"):
+        body = state.features_encoder.encode(position, mimetype)
+    return current_app.response_class(body, mimetype=mimetype)
+
 # Point API pour effectuer une prédiction avec le modèle
-@app.route('/api/predict/<int:id>', methods=['GET'])
+@api.route('/api/predict/<int:id>', methods=['GET'])
 def predict(id):
-    if id in available_ids:
-        client_data = data.loc[id]  # Obtenir les données prétraitées du client
-        prediction_proba = model.predict_proba(client_data.values.reshape(1, -1))[:, 1]
-        prediction_proba_value = prediction_proba[0]  # Extraire la valeur de probabilité
-        prediction = "Denied" if prediction_proba_value >= 0.435 else "Accepted"
-        return jsonify({"probability": prediction_proba_value, "decision": prediction})
+    state = get_state()
+    with stage("lookup"):
+        position = state.data_index.position(id)
+    if position is not None:
+        if state.score_table is not None:
+            # Client de X_test : score lu dans la table précalculée
+            with stage("score_table"):
+                prediction_proba_value = float(state.score_table.probabilities[position])
+        else:
+            client_data = state.features[position]  # Obtenir les données prétraitées du client
+            prediction_proba = state.score_rows(client_data.reshape(1, -1))
+            prediction_proba_value = prediction_proba[0]  # Extraire la valeur de probabilité
+        if state.drift is not None:
+            with stage("drift"):
+                state.drift.observe(state.features[position], prediction_proba_value)
+        prediction = decision(prediction_proba_value)
+        with stage("serialize"):
+            return respond({"probability": prediction_proba_value, "decision": prediction})
     else:
         return jsonify({"error": "Client ID not found"}), 404
 
+# Point API pour effectuer des prédictions groupées (liste d'ID et/ou lignes de features)
+@api.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    state = get_state()
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    ids = payload.get("ids", [])
+    rows = payload.get("rows", [])
+    chunk_size = payload.get("chunk_size", BATCH_CHUNK_SIZE)
+    if not isinstance(ids, list) or not isinstance(rows, list):
+        return jsonify({"error": "'ids' and 'rows' must be lists"}), 400
+    if not is_int(chunk_size) or chunk_size <= 0:
+        return jsonify({"error": "'chunk_size' must be a positive integer"}), 400
+    if len(ids) + len(rows) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE} items)"}), 413
+
+    # Résolution des ID en positions en un seul appel, les ID inconnus sont signalés individuellement
+    valid_ids = [i for i in ids if is_int(i)]
+    with stage("lookup"):
+        lookup = dict(zip(valid_ids, state.data_index.positions(valid_ids).tolist()))
+    results = []
+    positions = []
+    for client_id in ids:
+        position = lookup.get(client_id) if is_int(client_id) else None
+        if position is None:
+            results.append({"id": client_id, "error": "Invalid client ID"})
+        elif position < 0:
+            results.append({"id": client_id, "error": "Client ID not found"})
+        else:
+            positions.append(position)
+            results.append({"id": client_id})
+
+    # Validation des lignes de features fournies directement
+    columns = state.data.columns.tolist()
+    rows_features = []
+    for i, row in enumerate(rows):
+        try:
+            rows_features.append(row_to_features(row, columns))
+            results.append({"row": i})
+        except (TypeError, ValueError) as e:
+            results.append({"row": i, "error": str(e)})
+
+    # Clients connus : lecture dans la table des scores, sinon une seule extraction indexée
+    if state.score_table is not None:
+        probas = state.score_table.probabilities[positions]
+    else:
+        probas = state.score_rows(state.features[positions], chunk_size) if positions else np.empty(0)
+    # Lignes fournies : un appel vectorisé au modèle
+    if rows_features:
+        rows_features = np.asarray(rows_features, dtype=np.float64)
+        probas = np.concatenate([probas, state.score_rows(rows_features, chunk_size)])
+    if state.drift is not None and len(probas):
+        with stage("drift"):
+            if positions:
+                state.drift.observe(state.features[positions], probas[:len(positions)])
+            if len(rows_features):
+                state.drift.observe(rows_features, probas[len(positions):])
+
+    scored = iter(probas.tolist())
+    for item in results:
+        if "error" not in item:
+            proba = next(scored)
+            item["probability"] = proba
+            item["decision"] = decision(proba)
+    with stage("serialize"):
+        return respond({"results": results, "n_scored": len(probas), "n_errors": len(results) - len(probas)})
+
+def top_k_arg(value):
+    if not is_int(value) or not 1 <= value <= MAX_TOP_K:
+        raise ValueError(f"'k' must be an integer between 1 and {MAX_TOP_K}")
+    return value
+
+# Point API pour fournir l'explication SHAP d'un client (?k= contributions, ?full=1 pour toutes les valeurs)
+@api.route('/api/explain/<int:id>', methods=['GET'])
+def explain(id):
+    state = get_state()
+    position = state.data_index.position(id)
+    if position is None:
+        return jsonify({"error": "Client ID not found"}), 404
+    try:
+        k = top_k_arg(request.args.get("k", 10, type=int))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    full = request.args.get("full", "0") in ("1", "true")
+    return respond({"id": id, **state.explainer.explain(position, k=k, full=full)})
+
+# Point API pour fournir les explications SHAP de plusieurs clients
+@api.route('/api/explain/batch', methods=['POST'])
+def explain_batch():
+    state = get_state()
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("ids", []), list):
+        return jsonify({"error": "Expected a JSON object with an 'ids' list"}), 400
+    ids = payload.get("ids", [])
+    if len(ids) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Batch too large (max {MAX_BATCH_SIZE} items)"}), 413
+    try:
+        k = top_k_arg(payload.get("k", 10))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    results = []
+    positions = []
+    for client_id in ids:
+        position = state.data_index.position(client_id) if is_int(client_id) else None
+        if position is None:
+            results.append({"id": client_id, "error": "Client ID not found"})
+        else:
+            positions.append(position)
+            results.append({"id": client_id})
+    explanations = iter(state.explainer.explain_many(positions, k=k))
+    for item in results:
+        if "error" not in item:
+            item.update(next(explanations))
+    return respond({"results": results})
+
+# Point API pour fournir les clients de X_test les plus proches d'un client (?k=), avec leur TARGET
+@api.route('/api/similar/<int:id>', methods=['GET'])
+def similar(id):
+    state = get_state()
+    if state.neighbors is None:
+        return jsonify({"error": "Similar-client index disabled (set SCORING_SIMILAR=1)"}), 404
+    position = state.data_index.position(id)
+    if position is None:
+        return jsonify({"error": "Client ID not found"}), 404
+    k = request.args.get("k", 10, type=int)
+    if not 1 <= k <= MAX_NEIGHBORS:
+        return jsonify({"error": f"'k' must be an integer between 1 and {MAX_NEIGHBORS}"}), 400
+    with stage("neighbors"):
+        distances, positions = state.neighbors.similar(position, k)
+    targets = state.targets[positions]
+    probabilities = state.score_table.probabilities[positions] if state.score_table is not None else None
+    neighbors = []
+    for i, neighbor in enumerate(positions.tolist()):
+        item = {
+            "id": int(state.data_index.ids[neighbor]),
+            "distance": float(distances[i]),
+            "TARGET": None if np.isnan(targets[i]) else int(targets[i]),
+        }
+        if probabilities is not None:
+            item["probability"] = float(probabilities[i])
+            item["decision"] = decision(item["probability"])
+        neighbors.append(item)
+    known = targets[~np.isnan(targets)]
+    with stage("serialize"):
+        return respond({
+            "id": id,
+            "k": len(neighbors),
+            "neighbors": neighbors,
+            "default_rate": float(known.mean()) if len(known) else None,
+        })
+
+# Point API pour fournir les statistiques de population (résumés, centiles, histogrammes par groupe)
+@api.route('/api/stats', methods=['GET'])
+def population_stats():
+    return respond(get_state().population.payload)
+
+# Point API pour situer un client dans la population : rangs centiles dans chaque groupe
+@api.route('/api/stats/<int:id>', methods=['GET'])
+def client_stats(id):
+    state = get_state()
+    position = state.data_index.position(id)
+    if position is None:
+        return jsonify({"error": "Client ID not found"}), 404
+    with stage("stats"):
+        result = state.population.client(position)
+    return respond({"id": id, "version": state.population.version, **result})
+
+def thresholds_arg(value):
+    if value is None:
+        return np.unique(np.append(threshold_grid(), SEUIL))
+    if isinstance(value, dict):
+        start, stop, num = value.get("start", 0.0), value.get("stop", 1.0), value.get("num", 101)
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (start, stop)) or not is_int(num):
+            raise ValueError("'thresholds' grid needs numeric 'start'/'stop' and an integer 'num'")
+        # Vérifié avant de construire la grille : num n'est pas borné par le JSON reçu
+        if not 1 <= num <= MAX_THRESHOLDS:
+            raise ValueError(f"'thresholds' grid 'num' must be between 1 and {MAX_THRESHOLDS}")
+        if not (np.isfinite(start) and np.isfinite(stop) and start <= stop):
+            raise ValueError("'thresholds' grid needs finite 'start' <= 'stop'")
+        value = threshold_grid(start, stop, num).tolist()
+    if (not isinstance(value, list) or not 1 <= len(value) <= MAX_THRESHOLDS
+            or not all(isinstance(t, (int, float)) and not isinstance(t, bool) for t in value)):
+        raise ValueError(f"'thresholds' must be a list of 1 to {MAX_THRESHOLDS} numbers or a {{start, stop, num}} grid")
+    return np.asarray(value, dtype=np.float64)
+
+# Point API de simulation : balayage de seuils sur le portefeuille ou une cohorte (scores
+# précalculés) et variantes « et si » ({feature: {"set"|"add"|"multiply": valeur}}),
+# toutes évaluées en un seul appel groupé au modèle
+@api.route('/api/simulate', methods=['POST'])
+def simulate():
+    state = get_state()
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    ids = payload.get("ids")
+    perturbations = payload.get("perturbations", [])
+    costs = payload.get("costs", {})
+    try:
+        thresholds = thresholds_arg(payload.get("thresholds"))
+        if not isinstance(costs, dict) or not all(
+                isinstance(costs.get(k, 0), (int, float)) and not isinstance(costs.get(k), bool) for k in ("false_negative", "false_positive")):
+            raise ValueError("'costs' must be an object with numeric 'false_negative' and 'false_positive'")
+        if not isinstance(perturbations, list) or len(perturbations) > MAX_VARIANTS:
+            raise ValueError(f"'perturbations' must be a list of at most {MAX_VARIANTS} variants")
+        columns = state.data.columns.tolist()
+        variants = [parse_perturbation(perturbation, columns) for perturbation in perturbations]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cost_args = (costs.get("false_negative"), costs.get("false_positive"))
+
+    # Cohorte : tout le portefeuille par défaut, sinon les ID fournis (tous connus)
+    if ids is None:
+        positions = None
+        sweep = state.portfolio_sweep
+    else:
+        if not isinstance(ids, list) or not ids or not all(is_int(i) for i in ids):
+            return jsonify({"error": "'ids' must be a non-empty list of client IDs"}), 400
+        positions = state.data_index.positions(ids)
+        unknown = [client_id for client_id, position in zip(ids, positions.tolist()) if position < 0]
+        if unknown:
+            return jsonify({"error": "Client ID not found", "ids": unknown[:100]}), 404
+        sweep = ThresholdSweep(state.probabilities[positions], state.targets[positions])
+    n_rows = (len(state.data) if positions is None else len(positions)) * len(variants)
+    if n_rows > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Simulation too large (max {MAX_BATCH_SIZE} scored rows)"}), 413
+
+    with stage("simulation"):
+        result = {"threshold": SEUIL, "baseline": sweep(thresholds, *cost_args), "variants": []}
+        if positions is not None:
+            result["baseline"]["probabilities"] = state.probabilities[positions].tolist()
+        if variants:
+            base = state.features if positions is None else state.features[positions]
+            targets = state.targets if positions is None else state.targets[positions]
+            for perturbation, probabilities in zip(perturbations, score_variants(state.predict_proba_chunked, base, variants)):
+                variant = {"perturbation": perturbation, **ThresholdSweep(probabilities, targets)(thresholds, *cost_args)}
+                if positions is not None:
+                    variant["probabilities"] = probabilities.tolist()
+                result["variants"].append(variant)
+    with stage("serialize"):
+        return respond(result)
+
+# Point API pour fournir les indicateurs de dérive depuis le démarrage du worker
+# (?top= features les plus dérivantes, ?reset=1 pour repartir de zéro)
+@api.route('/api/drift', methods=['GET'])
+def drift():
+    state = get_state()
+    if state.drift is None:
+        return jsonify({"error": "Drift monitoring disabled (set SCORING_DRIFT=1)"}), 404
+    top = request.args.get("top", 20, type=int)
+    if not 1 <= top <= len(state.data.columns):
+        return jsonify({"error": f"'top' must be an integer between 1 and {len(state.data.columns)}"}), 400
+    report = state.drift.report(top=top)
+    if request.args.get("reset", "0") in ("1", "true"):
+        state.drift.reset()
+    return respond(report)
+
+# Point API pour fournir la version du modèle servi
+@api.route('/api/model', methods=['GET'])
+def model_info():
+    state = get_state()
+    return respond({**state.model_info, "version": state.version, "inference_backend": config.INFERENCE_BACKEND})
+
+# Métriques du processus au format texte de Prometheus
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    return current_app.response_class(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+# Piles échantillonnées par le profileur (format « folded », ?reset=1 pour repartir de zéro)
+@api.route('/metrics/profile', methods=['GET'])
+def profile():
+    profiler = current_app.extensions["profiler"]
+    if profiler is None:
+        return jsonify({"error": "Profiler disabled (set SCORING_PROFILER=1)"}), 404
+    folded = profiler.folded(reset=request.args.get("reset", "0") in ("1", "true"))
+    return current_app.response_class(folded, mimetype="text/plain")
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # Serveur de développement ; en production : gunicorn -c gunicorn.conf.py wsgi:app
+    create_app().run(host='0.0.0.0', port=int(os.environ.get("PORT", 5000)),
+                     debug=os.environ.get("SCORING_DEBUG", "0") == "1")
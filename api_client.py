@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Client HTTP partagé par les dashboards pour interroger l'API de scoring.
+#   - une session requests dont les connexions sont conservées (keep-alive) ;
+#   - délais de connexion et de lecture, nouvelles tentatives avec attente
+#     croissante sur les erreurs de connexion et les réponses 502/503/504 ;
+#   - les appels indépendants concernant un client sont lancés en parallèle ;
+#   - cache LRU borné avec durée de vie, indexé par point d'entrée et ID client.
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+# Parties disponibles pour client_bundle : nom -> chemin de l'API
+PARTS = {
+    "client": "/api/client/{id}",
+    "preprocessed": "/api/client_preprocessed/{id}",
+    "prediction": "/api/predict/{id}",
+    "explanation": "/api/explain/{id}?full=1",
+    "similar": "/api/similar/{id}?k=10",
+    "stats": "/api/stats/{id}",
+}
+
+
+class TTLCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class ScoringApiClient:
+    def __init__(self, base_url=None, timeout=None, retries=None, pool_size=None, cache_size=None, cache_ttl=None):
+        self.base_url = (base_url or config.API_BASE_URL).rstrip("/")
+        self.timeout = timeout or (config.API_CONNECT_TIMEOUT, config.API_READ_TIMEOUT)
+        pool_size = pool_size or config.API_POOL_SIZE
+        retry = Retry(
+            total=config.API_RETRIES if retries is None else retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="scoring-api")
+        self.cache = TTLCache(cache_size or config.API_CACHE_SIZE, config.API_CACHE_TTL if cache_ttl is None else cache_ttl)
+
+    def get_json(self, path):
+        response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _cached(self, key, path):
+        value = self.cache.get(key)
+        if value is None:
+            value = self.get_json(path)
+            self.cache.set(key, value)
+        return value
+
+    def available_ids(self):
+        return self._cached(("clients",), "/api/clients")["available_ids"]
+
+    def part(self, name, client_id):
+        return self._cached((name, client_id), PARTS[name].format(id=client_id))
+
+    # Plusieurs parties d'un même client, récupérées en parallèle sur le pool de connexions
+    def client_bundle(self, client_id, parts=("client", "preprocessed", "prediction")):
+        futures = {name: self._executor.submit(self.part, name, client_id) for name in parts}
+        return {name: future.result() for name, future in futures.items()}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
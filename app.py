@@ -7,60 +7,24 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-import requests
-import shap
-import joblib
-import io
-import urllib.request
-from zipfile import ZipFile
-plt.style.use('fivethirtyeight')
+import config
+from api_client import ScoringApiClient
 
-api_base_url = "http://35.181.54.91:5000"    
-model_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/modele_lgbm_over.pkl"
+# Client de l'API partagé par toutes les sessions (connexions conservées, cache par client)
+@st.cache_resource()
+def get_api_client():
+    return ScoringApiClient(config.API_BASE_URL)
 
 # Fonction pour obtenir les IDs clients disponibles depuis l'API
-@st.cache_data()
-def get_available_ids(api_base_url):
-    ids_endpoint = f"{api_base_url}/api/clients"
-    response = requests.get(ids_endpoint)
-    available_ids_data = response.json()
-    available_ids = available_ids_data["available_ids"]
-    return available_ids
+def get_available_ids():
+    return get_api_client().available_ids()
 
-# Fonction pour obtenir les données d'un client depuis l'API
-@st.cache_data()
-def get_client_data(selected_id):
-    client_data_endpoint = f"{api_base_url}/api/client/{selected_id}"
-    response = requests.get(client_data_endpoint)
-    client_data = response.json()
-    return client_data
-
-# Fonction pour obtenir les données prétraitées d'un client depuis l'API
-@st.cache_data(hash_funcs={hash: hash})
-def get_client_preprocessed_data(selected_id):
-    api_url = f"{api_base_url}/api/client_preprocessed/{selected_id}"
-    response = requests.get(api_url)    
-    try:
-        response_data = response.json()
-        if isinstance(response_data, dict):
-            client_preprocessed_data = response_data
-            columns = list(client_preprocessed_data.keys())
-            data = pd.DataFrame.from_dict(client_preprocessed_data, orient='index')
-            return data
-        else:
-            raise ValueError("Invalid JSON response")
-    except Exception as e:
-        print("Error decoding JSON response:", e)
-        return None
+# Fonction pour obtenir en parallèle les données, les données prétraitées, la prédiction et la position d'un client dans la population
+def get_client_bundle(selected_id):
+    bundle = get_api_client().client_bundle(selected_id, parts=("client", "preprocessed", "prediction", "stats"))
+    client_data = pd.DataFrame.from_dict(bundle["preprocessed"], orient='index').astype(float)
+    return bundle["client"], client_data, bundle["prediction"], bundle["stats"]
            
-def load_model(model_url):    
-    response = requests.get(model_url)
-    model = joblib.load(io.BytesIO(response.content))
-    return model 
-    
 def main():
         
     html_temp = """
@@ -97,13 +61,13 @@ def main():
     )
     
     # obtenir les ids
-    available_ids = get_available_ids(api_base_url)
+    available_ids = get_available_ids()
            
     # Sélectionner un ID client dans une liste déroulante
     selected_id = int(st.selectbox("Sélectionner un ID client", available_ids))
     
-    # obtenir les informations du client
-    client_info = get_client_data(selected_id)     
+    # obtenir les informations du client, ses données prétraitées et sa prédiction en parallèle
+    client_info, client_data, prediction_data, client_stats = get_client_bundle(selected_id)
     
     # Afficher les informations du client
     st.sidebar.subheader("Informations du Client")
@@ -112,18 +76,18 @@ def main():
     st.sidebar.write("Montant de crédit demandé :", client_info["AMT_CREDIT"])
     st.sidebar.write("Montant de l'annuité :", client_info["AMT_ANNUITY"])
     st.sidebar.write("Montant des biens pour le crédit :", client_info["AMT_GOODS_PRICE"])
-    
-    # charger les données et le modele en cache
-    client_data_json = get_client_preprocessed_data(selected_id)       
-    client_data = pd.DataFrame.from_dict(client_data_json)  
-    model = load_model(model_url)
 
+    # Position du client dans la population (centiles précalculés par l'API)
+    st.sidebar.subheader("Position dans la population")
+    for name, feature in client_stats["features"].items():
+        percentiles = {group: "-" if p is None else f"{p:.0f}" for group, p in feature["percentiles"].items()}
+        st.sidebar.write(f"{name} : centile {percentiles['all']} "
+                         f"(acceptés : {percentiles['accepted']}, refusés : {percentiles['denied']})")
     
+
     # Obtenir la valeur de TARGET pour le client sélectionné depuis le JSON
     target_value = client_info["TARGET"]
-    # Faire une prédiction avec le modèle
-    response = requests.get(f"{api_base_url}/api/predict/{selected_id}")
-    prediction_data = response.json()    
+    # Prédiction obtenue de l'API
     prediction_proba = prediction_data["probability"]
     prediction_decision = prediction_data["decision"]
 
@@ -140,6 +104,13 @@ def main():
         st.write("La prédiction indique un refus de crédit.")            
     else:
         st.write("La prédiction indique une acceptation de crédit.")                      
+
+    # Clients de la base les plus proches et leur TARGET réelle
+    similar = get_api_client().part("similar", selected_id)
+    st.subheader("Clients similaires")
+    if similar["default_rate"] is not None:
+        st.write(f"Taux de défaut parmi les {similar['k']} clients les plus proches : {similar['default_rate']:.0%}")
+    st.dataframe(pd.DataFrame(similar["neighbors"]).set_index("id"))
                 
 
 if __name__ == '__main__':
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Cache local des artefacts (X_test.zip, X_test_brut.zip, modèle).
+# Les fichiers sont stockés sous leur empreinte sha256 dans CACHE_DIR/blobs et un
+# index (CACHE_DIR/index.json) associe chaque nom d'artefact à sa dernière empreinte.
+# Le téléchargement n'est refait que si l'empreinte attendue (manifeste) ou l'ETag
+# distant a changé ; sans réseau, la dernière version valide du cache est utilisée.
+# La réponse du serveur est réutilisée pendant SCORING_ARTIFACT_REVALIDATE_INTERVAL
+# secondes : les appels suivants ne refont pas de requête conditionnelle, sauf
+# artifact_path(name, refresh=True).
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import config
+
+DATA_ARTIFACT = "X_test.zip"
+RAW_DATA_ARTIFACT = "X_test_brut.zip"
+MODEL_ARTIFACT = "modele_lgbm_over.pkl"
+ARTIFACTS = (DATA_ARTIFACT, RAW_DATA_ARTIFACT, MODEL_ARTIFACT)
+
+# Empreintes déjà vérifiées dans ce processus (chemin -> sha256)
+_verified = {}
+# Empreintes des fichiers locaux ((chemin, date de modification, taille) -> sha256)
+_checksums = {}
+# Dernière revalidation auprès du serveur (nom -> (instant, chemin))
+_revalidated = {}
+
+
+def sha256_file(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _index_path():
+    return os.path.join(config.CACHE_DIR, "index.json")
+
+
+def _blob_path(checksum):
+    return os.path.join(config.CACHE_DIR, "blobs", checksum)
+
+
+def _read_index():
+    try:
+        with open(_index_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(index):
+    # Écriture atomique : plusieurs workers peuvent démarrer en même temps
+    fd, tmp = tempfile.mkstemp(dir=config.CACHE_DIR, suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, _index_path())
+
+
+def _expected_checksums():
+    if not config.ARTIFACT_MANIFEST:
+        return {}
+    with open(config.ARTIFACT_MANIFEST, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _valid_blob(checksum):
+    path = _blob_path(checksum)
+    if not os.path.exists(path):
+        return None
+    if _verified.get(path) != checksum:
+        if sha256_file(path) != checksum:
+            # Fichier corrompu : il sera téléchargé à nouveau
+            os.remove(path)
+            return None
+        _verified[path] = checksum
+    return path
+
+
+def _download(name, url, headers):
+    import requests
+
+    response = requests.get(url, headers=headers, stream=True, timeout=config.DOWNLOAD_TIMEOUT)
+    if response.status_code == 304:
+        return None, None
+    response.raise_for_status()
+    os.makedirs(os.path.join(config.CACHE_DIR, "blobs"), exist_ok=True)
+    digest = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=os.path.join(config.CACHE_DIR, "blobs"), prefix=name, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for block in response.iter_content(chunk_size=1 << 20):
+                digest.update(block)
+                f.write(block)
+        checksum = digest.hexdigest()
+        os.replace(tmp, _blob_path(checksum))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _verified[_blob_path(checksum)] = checksum
+    return checksum, response.headers.get("ETag")
+
+
+def artifact_path(name, refresh=False):
+    # 1. Répertoire local explicite
+    if config.ARTIFACT_DIR:
+        path = os.path.join(config.ARTIFACT_DIR, name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Artifact {name} not found in {config.ARTIFACT_DIR}")
+        expected = _expected_checksums().get(name)
+        if expected:
+            checksum = _local_checksum(path)
+            if checksum != expected:
+                raise ValueError(f"Checksum mismatch for {name}: expected {expected}, got {checksum}")
+        return path
+
+    index = _read_index()
+    entry = index.get(name, {})
+    expected = _expected_checksums().get(name)
+
+    # 2. Version attendue déjà présente dans le cache : aucun accès réseau
+    if expected:
+        path = _valid_blob(expected)
+        if path:
+            return path
+    cached = _valid_blob(entry["sha256"]) if entry.get("sha256") and not expected else None
+    if config.OFFLINE:
+        if cached:
+            return cached
+        raise FileNotFoundError(f"Artifact {name} is not cached in {config.CACHE_DIR} (offline mode)")
+
+    # 3. Version revalidée récemment : aucun accès réseau
+    if cached and not refresh:
+        checked_at, path = _revalidated.get(name, (None, None))
+        if path == cached and time.monotonic() - checked_at < config.ARTIFACT_REVALIDATE_INTERVAL:
+            return cached
+
+    # 4. Requête conditionnelle : le fichier n'est retéléchargé que s'il a changé
+    url = f"{config.ARTIFACT_BASE_URL}/{name}"
+    headers = {"If-None-Match": entry["etag"]} if cached and entry.get("etag") else {}
+    try:
+        checksum, etag = _download(name, url, headers)
+    except Exception:
+        if cached:
+            # Serveur injoignable : le cache est réutilisé sans réessayer à chaque appel
+            _revalidated[name] = (time.monotonic(), cached)
+            return cached
+        raise
+    if checksum is None:
+        _revalidated[name] = (time.monotonic(), cached)
+        return cached
+    if expected and checksum != expected:
+        raise ValueError(f"Checksum mismatch for {name}: expected {expected}, got {checksum}")
+
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    index = _read_index()
+    index[name] = {"sha256": checksum, "etag": etag, "url": url}
+    _write_index(index)
+    _revalidated[name] = (time.monotonic(), _blob_path(checksum))
+    return _blob_path(checksum)
+
+
+# Empreinte d'un fichier d'un répertoire local, recalculée s'il a été remplacé
+def _local_checksum(path):
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key not in _checksums:
+        _checksums[key] = sha256_file(path)
+    return _checksums[key]
+
+
+def artifact_checksum(name, refresh=False):
+    path = artifact_path(name, refresh)
+    if _verified.get(path):
+        return _verified[path]
+    return _local_checksum(path)
+
+
+if __name__ == '__main__':
+    # Pré-remplit le cache pour permettre un démarrage hors ligne
+    for name in ARTIFACTS:
+        print(name, artifact_checksum(name), artifact_path(name))
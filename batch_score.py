@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Scoring en masse d'un fichier de features prétraitées (CSV ou Parquet), de taille
+# quelconque, à mémoire constante :
+#   - le fichier est lu par paquets de --chunk-size lignes ;
+#   - chaque paquet est évalué de façon vectorisée dans un pool de processus (un par
+#     cœur par défaut), chacun chargeant le modèle une seule fois ;
+#   - au plus 2 paquets par worker sont en cours à tout instant, et les résultats
+#     sont écrits dans l'ordre au fil de l'eau dans le fichier CSV de sortie ;
+#   - un point de reprise (<sortie>.ckpt) est mis à jour après chaque paquet :
+#     relancer la même commande reprend là où le traitement s'était arrêté.
+# Même chargement du modèle et même règle de décision (seuil SCORING_THRESHOLD) que l'API.
+#
+#   python batch_score.py demandes.parquet scores.csv [--chunk-size 50000] [--workers 8]
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import config
+from scoring import SEUIL, load_model
+from tree_engine import make_predictor
+
+# Prédicteur du processus courant (initialisé une fois par worker)
+_predict = None
+
+
+def _init_worker(backend):
+    global _predict
+    _predict = make_predictor(load_model(), backend)
+
+
+def _score(X):
+    return _predict(X)
+
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Paquets (DataFrame) du fichier d'entrée, en sautant les skip_rows premières lignes
+def read_chunks(path, chunk_size, skip_rows=0):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        skipped = 0
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            if skipped + batch.num_rows <= skip_rows:
+                skipped += batch.num_rows
+                continue
+            chunk = batch.to_pandas()
+            if skipped < skip_rows:
+                chunk = chunk.iloc[skip_rows - skipped:]
+                skipped = skip_rows
+            yield chunk
+    else:
+        # skiprows sous forme de fonction : pas d'ensemble de numéros de lignes en mémoire
+        yield from pd.read_csv(path, chunksize=chunk_size, skiprows=lambda i: 0 < i <= skip_rows, encoding="utf-8")
+
+
+def input_signature(path):
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def read_checkpoint(path, signature, chunk_size, output_path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint["signature"] != signature or checkpoint["chunk_size"] != chunk_size:
+        raise SystemExit(f"{path} was written for another input or chunk size; delete it to start over")
+    # Sortie supprimée ou plus courte que le dernier paquet validé : reprise impossible,
+    # l'évaluation repart de la première ligne
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint["output_bytes"]:
+        print(f"{output_path} absent ou incomplet : {path} ignoré, reprise depuis le début", file=sys.stderr)
+        return None
+    return checkpoint
+
+
+def write_checkpoint(path, checkpoint):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def run(args):
+    model = load_model()
+    feature_names = list(model.booster_.feature_name())
+    signature = input_signature(args.input)
+    checkpoint_path = f"{args.output}.ckpt"
+    checkpoint = read_checkpoint(checkpoint_path, signature, args.chunk_size, args.output) or {
+        "signature": signature, "chunk_size": args.chunk_size, "rows_done": 0, "output_bytes": 0}
+
+    # Reprise : on tronque la sortie au dernier paquet validé par le point de reprise
+    output = open(args.output, "r+" if checkpoint["rows_done"] else "w", newline="", encoding="utf-8")
+    output.truncate(checkpoint["output_bytes"])
+    output.seek(checkpoint["output_bytes"])
+    writer = csv.writer(output)
+    if not checkpoint["rows_done"]:
+        writer.writerow([args.id_column, "probability", "decision"])
+
+    def write(ids, probas):
+        denied = probas >= SEUIL
+        writer.writerows(zip(ids, probas.tolist(), np.where(denied, "Denied", "Accepted").tolist()))
+        output.flush()
+        os.fsync(output.fileno())
+        checkpoint["rows_done"] += len(ids)
+        checkpoint["output_bytes"] = output.tell()
+        write_checkpoint(checkpoint_path, checkpoint)
+
+    workers = args.workers if args.workers is not None else available_cores()
+    pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(args.backend,)) if workers > 0 else None
+    if pool is None:
+        _init_worker(args.backend)
+    pending = deque()
+    start = time.perf_counter()
+    start_rows = checkpoint["rows_done"]
+    row_number = checkpoint["rows_done"]
+
+    def drain(limit):
+        while len(pending) > limit:
+            ids, future = pending.popleft()
+            write(ids, future.result() if pool else future)
+            elapsed = time.perf_counter() - start
+            rate = (checkpoint["rows_done"] - start_rows) / elapsed if elapsed else 0.0
+            print(f"{checkpoint['rows_done']} lignes évaluées, {rate:,.0f} lignes/s", file=sys.stderr)
+
+    try:
+        for chunk in read_chunks(args.input, args.chunk_size, skip_rows=checkpoint["rows_done"]):
+            missing = set(feature_names) - set(chunk.columns)
+            if missing:
+                raise SystemExit(f"Missing features in {args.input}: {sorted(missing)[:10]}...")
+            if args.id_column in chunk.columns:
+                ids = chunk[args.id_column].tolist()
+            else:
+                ids = list(range(row_number, row_number + len(chunk)))
+            row_number += len(chunk)
+            X = chunk[feature_names].to_numpy(dtype=np.float64)
+            pending.append((ids, pool.submit(_score, X) if pool else _score(X)))
+            # Au plus 2 paquets en attente par worker : la mémoire reste bornée
+            drain(2 * max(workers, 1) - 1)
+        drain(0)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        output.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    elapsed = time.perf_counter() - start
+    rows = checkpoint["rows_done"] - start_rows
+    print(f"Terminé : {checkpoint['rows_done']} lignes dans {args.output} "
+          f"({rows / elapsed if elapsed else 0:,.0f} lignes/s)", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring en masse d'un fichier de features prétraitées")
+    parser.add_argument("input", help="fichier CSV ou Parquet de features prétraitées")
+    parser.add_argument("output", help="fichier CSV de sortie (id, probability, decision)")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="lignes par paquet")
+    parser.add_argument("--workers", type=int, default=None, help="processus de scoring (par défaut un par cœur, 0 = aucun pool)")
+    parser.add_argument("--id-column", default="SK_ID_CURR")
+    parser.add_argument("--backend", default=config.INFERENCE_BACKEND, help="moteur d'inférence (sklearn, booster, compiled)")
+    args = parser.parse_args()
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+    run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Micro-batching des prédictions unitaires (SCORING_MICROBATCH=1).
+# Les requêtes concurrentes déposent leurs lignes dans une file ; un thread dédié
+# attend au plus SCORING_MICROBATCH_WAIT_MS après la première ligne en attente (ou
+# que SCORING_MICROBATCH_MAX_ROWS lignes soient arrivées), empile les lignes en une
+# matrice, appelle le modèle une seule fois et renvoie à chaque requête ses
+# probabilités via un Future. N requêtes simultanées coûtent ainsi un seul appel au
+# modèle au lieu de N.
+# Contre-pression : au-delà de SCORING_MICROBATCH_MAX_QUEUE lignes en attente, les
+# nouvelles requêtes sont refusées (QueueFull, HTTP 503) au lieu d'allonger la file.
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from metrics import MICROBATCH_QUEUE_ROWS, MICROBATCH_QUEUE_SECONDS, MICROBATCH_REJECTED, MICROBATCH_ROWS
+
+
+# Prédiction refusée faute de capacité : file pleine ou délai d'attente dépassé
+class Overloaded(Exception):
+    pass
+
+
+class QueueFull(Overloaded):
+    pass
+
+
+class MicroBatcher:
+    def __init__(self, predict, max_rows=64, max_wait=0.002, max_queue=1024):
+        self.predict = predict
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self._condition = threading.Condition()
+        # Éléments (lignes, future, instant de dépôt)
+        self._queue = deque()
+        self._queued_rows = 0
+        self._thread = None
+        self._closed = False
+
+    def _ensure_thread(self):
+        # Démarré à la première requête, donc dans chaque worker (un thread ne survit
+        # pas au fork de gunicorn --preload)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="microbatcher", daemon=True)
+            self._thread.start()
+
+    # Dépose des lignes à scorer ; le Future reçoit leurs probabilités
+    def submit(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        future = Future()
+        with self._condition:
+            closed = self._closed
+            if not closed:
+                self._enqueue(X, future)
+        if closed:
+            # Batcher remplacé (nouveau modèle) : les retardataires sont servis directement
+            future.set_result(self.predict(X))
+        return future
+
+    # Appelé sous le verrou
+    def _enqueue(self, X, future):
+        if self._queued_rows + len(X) > self.max_queue:
+            MICROBATCH_REJECTED.inc("queue_full")
+            raise QueueFull(f"{self._queued_rows} rows already queued")
+        self._ensure_thread()
+        self._queue.append((X, future, time.perf_counter()))
+        self._queued_rows += len(X)
+        MICROBATCH_QUEUE_ROWS.set(self._queued_rows)
+        self._condition.notify()
+
+    # Probabilités des lignes X, calculées dans le prochain appel groupé
+    def predict_rows(self, X, timeout=None):
+        future = self.submit(X)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            MICROBATCH_REJECTED.inc("timeout")
+            # Lignes encore en file : retirées, personne n'attendra plus leur résultat
+            if future.cancel():
+                self._discard(future)
+            raise Overloaded(f"no result within {timeout} s")
+
+    def _discard(self, future):
+        with self._condition:
+            for item in self._queue:
+                if item[1] is future:
+                    self._queue.remove(item)
+                    self._queued_rows -= len(item[0])
+                    MICROBATCH_QUEUE_ROWS.set(self._queued_rows)
+                    return
+
+    # Arrête le thread une fois la file vidée
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue:
+                if self._closed:
+                    return None
+                self._condition.wait()
+            # Fenêtre ouverte par la plus ancienne ligne en attente
+            deadline = self._queue[0][2] + self.max_wait
+            while self._queued_rows < self.max_rows and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch, rows = [], 0
+            while self._queue and (not batch or rows + len(self._queue[0][0]) <= self.max_rows):
+                item = self._queue.popleft()
+                batch.append(item)
+                rows += len(item[0])
+            self._queued_rows -= rows
+            MICROBATCH_QUEUE_ROWS.set(self._queued_rows)
+        # Passage à l'état « en cours » : les requêtes annulées entre-temps sont écartées
+        return [item for item in batch if item[1].set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            start = time.perf_counter()
+            for _, _, queued_at in batch:
+                MICROBATCH_QUEUE_SECONDS.observe(start - queued_at)
+            sizes = [len(X) for X, _, _ in batch]
+            MICROBATCH_ROWS.observe(sum(sizes))
+            try:
+                probabilities = np.asarray(self.predict(np.concatenate([X for X, _, _ in batch])))
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), part in zip(batch, np.split(probabilities, np.cumsum(sizes)[:-1])):
+                future.set_result(part)
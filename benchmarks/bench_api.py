@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Banc de mesure de l'API de scoring, exécutable hors ligne.
+# Un jeu de données synthétique de même forme (et, si disponibles, mêmes noms de
+# colonnes) que X_test.csv et un modèle LightGBM de substitution sont écrits dans un
+# répertoire temporaire servant de SCORING_ARTIFACT_DIR ; aucune requête réseau.
+# Mesures :
+#   - temps de démarrage : lecture des CSV zippés, chargement du modèle, construction
+#     du magasin binaire (compactage compris) puis ouverture du magasin ;
+#   - latence p50/p95/p99 de /api/predict/<id> (table des scores et modèle en direct) ;
+#   - débit et latence de /api/predict/<id> en direct sous --concurrency requêtes
+#     simultanées, sans puis avec micro-batching ;
+#   - coût de sérialisation de /api/client/<id> ;
+#   - débit de /api/predict/batch pour plusieurs tailles de lot ;
+#   - pic de mémoire résidente (RSS).
+# Les résultats sont écrits en JSON pour comparer les exécutions dans le temps.
+#
+#   python benchmarks/bench_api.py [--rows 48744] [--features 250] [--output résultats.json]
+#   python benchmarks/bench_api.py --url http://127.0.0.1:5000 --concurrency 32
+#   python benchmarks/bench_api.py --compare-servers --concurrency 32 --duration 30
+# La deuxième forme mesure le débit HTTP d'un serveur déjà lancé ; la troisième lance
+# successivement le serveur de développement et gunicorn sur les mêmes artefacts
+# synthétiques et leur applique la même charge.
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Colonnes brutes utilisées par les dashboards
+RAW_NUMERIC = ["TARGET", "DAYS_BIRTH", "AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "AMT_GOODS_PRICE"]
+RAW_CATEGORICAL = {
+    "NAME_CONTRACT_TYPE": ["Cash loans", "Revolving loans"],
+    "CODE_GENDER": ["F", "M"],
+    "NAME_INCOME_TYPE": ["Working", "Commercial associate", "Pensioner", "State servant"],
+}
+PERCENTILES = (50, 95, 99)
+
+
+def reference_columns():
+    # Noms de colonnes du vrai X_test si le magasin de features a déjà été construit
+    from feature_store import read_manifest
+    manifest = read_manifest()
+    if manifest:
+        return manifest["columns"], manifest["raw_columns"], manifest["shape"][0]
+    return None, None, None
+
+
+def make_synthetic_data(n_rows, n_features, columns=None, raw_columns=None, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = columns or [f"FEATURE_{i}" for i in range(n_features)]
+    ids = pd.Index(np.arange(100001, 100001 + n_rows, dtype=np.int64), name="SK_ID_CURR")
+    X = rng.normal(size=(n_rows, len(columns)))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    data = pd.DataFrame(X, index=ids, columns=columns)
+
+    raw = {
+        "TARGET": (rng.random(n_rows) < 0.08).astype(np.int64),
+        "DAYS_BIRTH": -rng.integers(21 * 365, 69 * 365, n_rows),
+        "AMT_INCOME_TOTAL": rng.lognormal(12, 0.5, n_rows).round(1),
+        "AMT_CREDIT": rng.lognormal(13, 0.6, n_rows).round(1),
+        "AMT_ANNUITY": rng.lognormal(10, 0.5, n_rows).round(1),
+        "AMT_GOODS_PRICE": rng.lognormal(12.8, 0.6, n_rows).round(1),
+    }
+    for name, values in RAW_CATEGORICAL.items():
+        raw[name] = rng.choice(values, n_rows)
+    for name in raw_columns or [f"RAW_{i}" for i in range(100)]:
+        if name not in raw:
+            raw[name] = rng.normal(size=n_rows)
+    raw_data = pd.DataFrame(raw, index=ids)
+    return data, raw_data
+
+
+def make_stand_in_model(data, raw_data, n_estimators, seed=0):
+    from lightgbm import LGBMClassifier
+    sample = data.sample(min(len(data), 20000), random_state=seed)
+    target = raw_data.loc[sample.index, "TARGET"]
+    model = LGBMClassifier(n_estimators=n_estimators, num_leaves=31, random_state=seed, verbose=-1)
+    model.fit(sample, target)
+    return model
+
+
+def write_artifacts(directory, data, raw_data, model):
+    import joblib
+    from artifacts import DATA_ARTIFACT, RAW_DATA_ARTIFACT, MODEL_ARTIFACT
+    for name, member, frame in ((DATA_ARTIFACT, "X_test.csv", data), (RAW_DATA_ARTIFACT, "X_test_brut.csv", raw_data)):
+        with zipfile.ZipFile(os.path.join(directory, name), "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr(member, frame.to_csv(encoding="utf-8"))
+    joblib.dump(model, os.path.join(directory, MODEL_ARTIFACT))
+
+
+def percentiles_ms(timings):
+    timings = np.asarray(timings) * 1000
+    result = {f"p{q}_ms": float(np.percentile(timings, q)) for q in PERCENTILES}
+    result["mean_ms"] = float(timings.mean())
+    result["n"] = len(timings)
+    return result
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def time_requests(client, urls, method="get", payloads=None):
+    timings = []
+    for i, url in enumerate(urls):
+        kwargs = {"json": payloads[i]} if payloads else {}
+        start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        response.get_data()
+        timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+    return timings
+
+
+# Requêtes réparties sur concurrency threads simultanés (un client de test par thread)
+def time_concurrent(app, urls, concurrency):
+    parts = [urls[i::concurrency] for i in range(concurrency)]
+    timings = [[] for _ in parts]
+
+    def worker(i):
+        timings[i] = time_requests(app.test_client(), parts[i])
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    timings = [t for part in timings for t in part]
+    return {**percentiles_ms(timings), "requests_per_s": len(timings) / elapsed, "concurrency": concurrency}
+
+
+def peak_rss_mb():
+    # ru_maxrss est en kilo-octets sous Linux et en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Répertoire temporaire contenant les artefacts synthétiques (données et modèle)
+def prepare_workdir(args):
+    columns, raw_columns, n_rows = reference_columns() if args.reference_columns else (None, None, None)
+    n_rows = args.rows or n_rows or 48744
+    data, raw_data = make_synthetic_data(n_rows, args.features, columns, raw_columns, seed=args.seed)
+    model = make_stand_in_model(data, raw_data, args.n_estimators, seed=args.seed)
+    workdir = tempfile.mkdtemp(prefix="scoring-bench-")
+    write_artifacts(workdir, data, raw_data, model)
+    return workdir
+
+
+# Tous les caches et précalculs dans le répertoire temporaire, sans réseau :
+# (attribut de config, variable d'environnement, sous-répertoire)
+WORKDIR_SETTINGS = (
+    ("ARTIFACT_DIR", "SCORING_ARTIFACT_DIR", ""),
+    ("STORE_DIR", "SCORING_STORE_DIR", "store"),
+    ("SCORE_TABLE_DIR", "SCORING_SCORE_TABLE_DIR", "scores"),
+    ("SHAP_DIR", "SCORING_SHAP_DIR", "shap"),
+    ("SIMILAR_DIR", "SCORING_SIMILAR_DIR", "neighbors"),
+    ("DRIFT_DIR", "SCORING_DRIFT_DIR", "drift"),
+)
+
+
+def run_offline(args):
+    import config
+
+    workdir = prepare_workdir(args)
+    for attribute, _, subdir in WORKDIR_SETTINGS:
+        setattr(config, attribute, os.path.join(workdir, subdir) if subdir else workdir)
+    config.OFFLINE = True
+
+    import api
+    from batcher import MicroBatcher
+    from feature_store import build_store, read_data_csv, read_raw_csv
+    from scoring import load_model
+
+    # Étapes d'un démarrage à froid, mesurées séparément : les chargeurs de l'API
+    # construiraient eux-mêmes le magasin au premier appel (compactage actif)
+    results = {"cold_start_s": {}}
+    _, results["cold_start_s"]["read_data_csv"] = timed(read_data_csv)
+    _, results["cold_start_s"]["read_raw_csv"] = timed(read_raw_csv)
+    model, results["cold_start_s"]["load_model"] = timed(load_model)
+    # Compactage, vérification du float32 avec le modèle et écriture du magasin
+    _, results["cold_start_s"]["build_feature_store"] = timed(build_store)
+    (data, _), results["cold_start_s"]["load_data_store"] = timed(api.load_data)
+    raw_data, results["cold_start_s"]["load_raw_data_store"] = timed(api.load_raw_data)
+    state, results["cold_start_s"]["scoring_state"] = timed(lambda: api.ScoringState(data, raw_data, model, version="bench"))
+
+    app = api.create_app(state)
+    client = app.test_client()
+    rng = np.random.default_rng(args.seed)
+    ids = rng.choice(state.available_ids, args.requests).tolist()
+
+    results["predict_table"] = percentiles_ms(time_requests(client, [f"/api/predict/{i}" for i in ids]))
+    # Même point d'entrée, modèle appelé en direct (table des scores désactivée)
+    score_table, state.score_table = state.score_table, None
+    results["predict_live"] = percentiles_ms(time_requests(client, [f"/api/predict/{i}" for i in ids]))
+    # Requêtes simultanées en direct : un appel au modèle par requête, puis micro-batching
+    batcher = state.batcher
+    state.batcher = None
+    results["predict_live_concurrent"] = time_concurrent(app, [f"/api/predict/{i}" for i in ids], args.concurrency)
+    state.batcher = MicroBatcher(state.predict_positive, config.MICROBATCH_MAX_ROWS, config.MICROBATCH_WAIT, config.MICROBATCH_MAX_QUEUE)
+    results["predict_live_microbatch"] = time_concurrent(app, [f"/api/predict/{i}" for i in ids], args.concurrency)
+    state.batcher.close()
+    state.batcher = batcher
+    results["client"] = percentiles_ms(time_requests(client, [f"/api/client/{i}" for i in ids]))
+
+    results["batch_live"] = {}
+    for size in args.batch_sizes:
+        batch_ids = rng.choice(state.available_ids, size).tolist()
+        timings = time_requests(client, ["/api/predict/batch"] * args.batch_repeat, "post", [{"ids": batch_ids}] * args.batch_repeat)
+        results["batch_live"][str(size)] = {**percentiles_ms(timings), "rows_per_s": size / float(np.median(timings))}
+    state.score_table = score_table
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    results["dataset"] = {"rows": len(state.data), "features": state.data.shape[1], "raw_columns": state.raw_data.shape[1],
+                          "n_estimators": args.n_estimators, "inference_backend": config.INFERENCE_BACKEND}
+    return results
+
+
+def run_http(args):
+    import requests
+
+    ids = requests.get(f"{args.url}/api/clients", timeout=30).json()["available_ids"]
+    rng = np.random.default_rng(args.seed)
+    deadline = time.perf_counter() + args.duration
+    timings, errors = [], []
+    lock = threading.Lock()
+
+    def worker(seed):
+        session = requests.Session()
+        local_rng = np.random.default_rng(seed)
+        local_timings, local_errors = [], 0
+        while time.perf_counter() < deadline:
+            client_id = ids[local_rng.integers(len(ids))]
+            start = time.perf_counter()
+            try:
+                ok = session.get(f"{args.url}/api/predict/{client_id}", timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            local_timings.append(time.perf_counter() - start)
+            local_errors += not ok
+        with lock:
+            timings.extend(local_timings)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(int(rng.integers(1 << 31)),)) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {"http_predict": {**percentiles_ms(timings), "requests_per_s": len(timings) / elapsed,
+                             "errors": int(sum(errors)), "concurrency": args.concurrency, "url": args.url}}
+
+
+# Serveurs comparés par --compare-servers, lancés depuis la racine du dépôt
+SERVERS = (
+    ("flask", [sys.executable, "api.py"]),
+    ("gunicorn", [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"]),
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, process, timeout):
+    import requests
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            if requests.get(f"{url}/api/clients", timeout=5).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} not ready after {timeout} s")
+
+
+# Même charge HTTP contre le serveur de développement Flask puis gunicorn, lancés
+# successivement sur les mêmes artefacts synthétiques et la même machine
+def compare_servers(args):
+    workdir = prepare_workdir(args)
+    env = {**os.environ, "SCORING_OFFLINE": "1"}
+    for _, variable, subdir in WORKDIR_SETTINGS:
+        env[variable] = os.path.join(workdir, subdir) if subdir else workdir
+    results = {}
+    for name, command in SERVERS:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        with open(os.path.join(workdir, f"{name}.log"), "w", encoding="utf-8") as log:
+            process = subprocess.Popen(command, cwd=ROOT, env={**env, "PORT": str(port)}, stdout=log, stderr=subprocess.STDOUT)
+            try:
+                wait_until_ready(url, process, args.startup_timeout)
+                results[name] = run_http(argparse.Namespace(**{**vars(args), "url": url}))["http_predict"]
+            finally:
+                process.terminate()
+                process.wait(timeout=60)
+        print(f"{name:9s} {results[name]['requests_per_s']:8.0f} req/s  p50 {results[name]['p50_ms']:.2f} ms  "
+              f"p99 {results[name]['p99_ms']:.2f} ms  erreurs {results[name]['errors']}", file=sys.stderr)
+    return {"servers": results, "workdir": workdir}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de mesure de l'API de scoring")
+    parser.add_argument("--rows", type=int, default=None, help="lignes du jeu synthétique (par défaut celles de X_test ou 48744)")
+    parser.add_argument("--features", type=int, default=250, help="features synthétiques si les colonnes réelles sont inconnues")
+    parser.add_argument("--no-reference-columns", dest="reference_columns", action="store_false",
+                        help="ne pas reprendre les colonnes du magasin de features local")
+    parser.add_argument("--n-estimators", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000, help="requêtes unitaires par mesure de latence")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--batch-repeat", type=int, default=10)
+    parser.add_argument("--url", help="mesure HTTP d'un serveur déjà lancé au lieu du banc hors ligne")
+    parser.add_argument("--compare-servers", action="store_true",
+                        help="lance le serveur de développement puis gunicorn et mesure leur débit HTTP")
+    parser.add_argument("--startup-timeout", type=float, default=600.0, help="attente maximale du démarrage de chaque serveur (s)")
+    parser.add_argument("--concurrency", type=int, default=16, help="requêtes simultanées (mesure HTTP et micro-batching)")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    if args.compare_servers:
+        results = compare_servers(args)
+    else:
+        results = run_http(args) if args.url else run_offline(args)
+    results["meta"] = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"bench-{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    json.dump(results, sys.stdout, indent=2)
+    print(f"\n-> {output}")
+
+
+if __name__ == '__main__':
+    main()
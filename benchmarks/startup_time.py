@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Temps de démarrage des dashboards Streamlit et de l'API.
+# Chaque module est importé dans un processus Python neuf avec -X importtime :
+# le temps total d'import (code de niveau module compris) approche le délai avant
+# le premier affichage d'une session. Le détail par paquet de premier niveau
+# (streamlit, pandas, matplotlib, shap...) montre ce qui coûte ; --feature mesure
+# en plus le premier usage d'une fonctionnalité chargée à la demande.
+# Les résultats sont écrits en JSON, comme ceux de bench_api.py.
+#
+#   python benchmarks/startup_time.py [--modules app dashboard_P7 dashboard] [--top 15] [--repeat 3]
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Premier usage des fonctionnalités chargées à la demande
+FEATURES = {
+    "plotting": "import plotting; plotting.pyplot(); import shap",
+}
+
+
+# Lignes « import time: self [us] | cumulative | module » de -X importtime
+def parse_importtime(stderr):
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def measure(code):
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                               capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+    if completed.returncode != 0:
+        raise SystemExit(f"{code!r} failed:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+# Temps propre (ms) cumulé par paquet de premier niveau (matplotlib.* -> matplotlib),
+# les plus coûteux d'abord : chaque module n'est compté qu'une fois
+def breakdown(imports, top):
+    packages = {}
+    for name, self_us, _ in imports:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    total_us = sum(packages.values())
+    ranked = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return total_us / 1000, {package: us / 1000 for package, us in ranked}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(code, top, repeat):
+    runs = [breakdown(measure(code), top) for _ in range(repeat)]
+    totals = [total for total, _ in runs]
+    # Détail de l'exécution médiane
+    median_run = sorted(runs, key=lambda run: run[0])[len(runs) // 2]
+    return {"total_ms": statistics.median(totals), "runs_ms": totals, "packages_ms": median_run[1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps d'import des dashboards et de l'API")
+    parser.add_argument("--modules", nargs="+", default=["app", "dashboard_P7", "dashboard", "api"])
+    parser.add_argument("--feature", nargs="*", choices=sorted(FEATURES), default=sorted(FEATURES),
+                        help="fonctionnalités chargées à la demande à mesurer")
+    parser.add_argument("--top", type=int, default=15, help="paquets détaillés par module")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="fichier JSON des résultats")
+    args = parser.parse_args()
+
+    results = {"modules": {}, "features": {}}
+    for module in args.modules:
+        results["modules"][module] = run(f"import {module}", args.top, args.repeat)
+        print(f"{module}: {results['modules'][module]['total_ms']:.0f} ms", file=sys.stderr)
+        for package, ms in results["modules"][module]["packages_ms"].items():
+            print(f"    {package:<24} {ms:8.1f} ms", file=sys.stderr)
+    for feature in args.feature:
+        results["features"][feature] = run(FEATURES[feature], args.top, args.repeat)
+        print(f"premier usage de {feature}: {results['features'][feature]['total_ms']:.0f} ms", file=sys.stderr)
+
+    results["meta"] = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"startup-{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"-> {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Compactage mémoire des données au chargement.
+#   - features du modèle : float32 seulement si les probabilités prédites sur toutes
+#     les lignes restent à FLOAT32_TOLERANCE près et qu'aucune décision ne change ;
+#     sinon elles restent en float64 ;
+#   - données brutes : entiers réduits au plus petit type suffisant, réels en float32
+#     seulement si la conversion est exacte, colonnes texte peu variées en catégories.
+# Chaque étape renvoie un rapport (mémoire avant/après, colonnes converties), affiché
+# par python feature_store.py et conservé dans le manifeste du magasin.
+
+import numpy as np
+import pandas as pd
+
+import config
+
+
+def memory_bytes(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def _report(before, after, **details):
+    return {"before_bytes": before, "after_bytes": after, **details}
+
+
+# Features du modèle en float32 si les prédictions n'en sont pas affectées.
+# predict : fonction X -> probabilité de la classe positive ; threshold : seuil de décision
+def compact_features(data, predict, threshold, tolerance=None, chunk_size=5000):
+    tolerance = config.FLOAT32_TOLERANCE if tolerance is None else tolerance
+    before = memory_bytes(data)
+    X64 = data.to_numpy(dtype=np.float64)
+    X32 = X64.astype(np.float32)
+    max_diff, flips = 0.0, 0
+    for start in range(0, len(X64), chunk_size):
+        p64 = predict(X64[start:start + chunk_size])
+        p32 = predict(X32[start:start + chunk_size])
+        if len(p64):
+            max_diff = max(max_diff, float(np.max(np.abs(p64 - p32))))
+        flips += int(np.count_nonzero((p64 >= threshold) != (p32 >= threshold)))
+    accepted = max_diff <= tolerance and flips == 0
+    X = X32 if accepted else X64
+    compacted = pd.DataFrame(X, index=data.index, columns=data.columns, copy=False)
+    return compacted, _report(before, memory_bytes(compacted), dtype=X.dtype.name,
+                              float32_max_abs_diff=max_diff, float32_decision_flips=flips)
+
+
+def _downcast_float(series):
+    candidate = series.astype(np.float32)
+    if np.array_equal(candidate.to_numpy(dtype=np.float64), series.to_numpy(dtype=np.float64), equal_nan=True):
+        return candidate
+    return series
+
+
+# Données brutes : réduction sans perte des types numériques et catégories pour le texte
+def compact_raw(raw_data, category_max_ratio=None):
+    category_max_ratio = config.CATEGORY_MAX_RATIO if category_max_ratio is None else category_max_ratio
+    before = memory_bytes(raw_data)
+    columns, converted = {}, {}
+    for column in raw_data.columns:
+        series = raw_data[column]
+        if pd.api.types.is_bool_dtype(series):
+            compact = series
+        elif pd.api.types.is_integer_dtype(series):
+            compact = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(series):
+            compact = _downcast_float(series)
+        elif series.dtype == object and len(series) and series.nunique(dropna=True) / len(series) <= category_max_ratio:
+            compact = series.astype("category")
+        else:
+            compact = series
+        if compact.dtype != series.dtype:
+            converted[column] = f"{series.dtype} -> {compact.dtype}"
+        columns[column] = compact
+    compacted = pd.DataFrame(columns, index=raw_data.index)
+    return compacted, _report(before, memory_bytes(compacted), converted=converted)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Paramètres communs à l'API, aux dashboards et aux outils en ligne de commande.
+# Chaque valeur peut être surchargée par une variable d'environnement.
+
+import os
+
+# Emplacement d'origine des artefacts (données et modèle)
+ARTIFACT_BASE_URL = os.environ.get(
+    "SCORING_ARTIFACT_BASE_URL",
+    "https://github.com/babi7777/scoring-model-credit-risk/raw/main",
+)
+# Répertoire local contenant déjà les artefacts : s'il est défini, aucun téléchargement n'a lieu
+ARTIFACT_DIR = os.environ.get("SCORING_ARTIFACT_DIR")
+# Cache disque des artefacts téléchargés (adressé par contenu)
+CACHE_DIR = os.environ.get(
+    "SCORING_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "scoring-model-credit-risk"),
+)
+# Fichier JSON optionnel {nom d'artefact: sha256} fixant les versions attendues
+ARTIFACT_MANIFEST = os.environ.get("SCORING_ARTIFACT_MANIFEST")
+# Démarrage hors ligne : uniquement le cache local, jamais le réseau
+OFFLINE = os.environ.get("SCORING_OFFLINE", "0") == "1"
+# Délai maximal (secondes) des téléchargements
+DOWNLOAD_TIMEOUT = float(os.environ.get("SCORING_DOWNLOAD_TIMEOUT", 60))
+# Durée (secondes) pendant laquelle un artefact revalidé auprès du serveur n'est pas redemandé
+ARTIFACT_REVALIDATE_INTERVAL = float(os.environ.get("SCORING_ARTIFACT_REVALIDATE_INTERVAL", 300))
+# Magasin de features binaire (matrice float32 mappée en mémoire + données brutes en Parquet)
+STORE_DIR = os.environ.get("SCORING_STORE_DIR", os.path.join(CACHE_DIR, "store"))
+# Seuil de décision : crédit refusé si la probabilité de défaut l'atteint
+THRESHOLD = float(os.environ.get("SCORING_THRESHOLD", 0.435))
+# Coûts métier de la simulation : défaut accepté (faux négatif) et bon client refusé (faux positif)
+COST_FALSE_NEGATIVE = float(os.environ.get("SCORING_COST_FALSE_NEGATIVE", 10))
+COST_FALSE_POSITIVE = float(os.environ.get("SCORING_COST_FALSE_POSITIVE", 1))
+# Moteur d'inférence : "sklearn" (predict_proba du wrapper), "booster" (prédicteur natif
+# LightGBM sans la validation sklearn) ou "compiled" (arbres exportés en tableaux NumPy)
+INFERENCE_BACKEND = os.environ.get("SCORING_INFERENCE_BACKEND", "sklearn")
+# Threads OpenMP des prédictions LightGBM (0 = réglage du modèle) ; fixé à 1 par
+# gunicorn.conf.py lorsque l'application est préchargée avant le fork des workers
+PREDICT_THREADS = int(os.environ.get("SCORING_PREDICT_THREADS", 0))
+# Table des scores précalculés sur X_test (désactivable avec SCORING_SCORE_TABLE=0)
+SCORE_TABLE = os.environ.get("SCORING_SCORE_TABLE", "1") == "1"
+SCORE_TABLE_DIR = os.environ.get("SCORING_SCORE_TABLE_DIR", os.path.join(CACHE_DIR, "scores"))
+# Explications SHAP précalculées (python explain.py) ; SCORING_SHAP_PRECOMPUTE=1 les
+# calcule au démarrage de l'API si elles n'existent pas encore (désactivé par défaut : le
+# calcul sur tout X_test retarderait chaque démarrage de plusieurs minutes)
+SHAP_DIR = os.environ.get("SCORING_SHAP_DIR", os.path.join(CACHE_DIR, "shap"))
+SHAP_PRECOMPUTE = os.environ.get("SCORING_SHAP_PRECOMPUTE", "0") == "1"
+# Nombre de contributions principales conservées par client
+SHAP_TOP_K = int(os.environ.get("SCORING_SHAP_TOP_K", 20))
+# Profileur par échantillonnage exposé sur /metrics/profile (SCORING_PROFILER=1)
+PROFILER = os.environ.get("SCORING_PROFILER", "0") == "1"
+PROFILER_INTERVAL = float(os.environ.get("SCORING_PROFILER_INTERVAL_MS", 5)) / 1000
+# Adresse de l'API utilisée par les dashboards
+API_BASE_URL = os.environ.get("SCORING_API_URL", "http://35.181.54.91:5000")
+# Client HTTP des dashboards : délais (connexion, lecture) en secondes, tentatives,
+# connexions conservées et cache des réponses (nombre d'entrées, durée de vie en secondes)
+API_CONNECT_TIMEOUT = float(os.environ.get("SCORING_API_CONNECT_TIMEOUT", 3.05))
+API_READ_TIMEOUT = float(os.environ.get("SCORING_API_READ_TIMEOUT", 30))
+API_RETRIES = int(os.environ.get("SCORING_API_RETRIES", 3))
+API_POOL_SIZE = int(os.environ.get("SCORING_API_POOL_SIZE", 8))
+API_CACHE_SIZE = int(os.environ.get("SCORING_API_CACHE_SIZE", 512))
+API_CACHE_TTL = float(os.environ.get("SCORING_API_CACHE_TTL", 300))
+# Remplacement à chaud du modèle lorsqu'un nouvel artefact apparaît (vérifié toutes les N secondes)
+MODEL_HOT_SWAP = os.environ.get("SCORING_MODEL_HOT_SWAP", "0") == "1"
+MODEL_CHECK_INTERVAL = float(os.environ.get("SCORING_MODEL_CHECK_INTERVAL", 60))
+# Compactage des données au chargement (types numériques réduits, catégories)
+COMPACT = os.environ.get("SCORING_COMPACT", "1") == "1"
+# Colonnes texte converties en catégories si (valeurs distinctes / lignes) ne dépasse pas ce ratio
+CATEGORY_MAX_RATIO = float(os.environ.get("SCORING_CATEGORY_MAX_RATIO", 0.5))
+# Écart maximal de probabilité toléré entre features float64 et float32
+FLOAT32_TOLERANCE = float(os.environ.get("SCORING_FLOAT32_TOLERANCE", 1e-6))
+# Index des clients similaires (python neighbors.py), désactivable avec SCORING_SIMILAR=0 ;
+# les features réduites sont projetées par ACP sur SCORING_SIMILAR_COMPONENTS axes (0 = aucune projection)
+SIMILAR = os.environ.get("SCORING_SIMILAR", "1") == "1"
+SIMILAR_DIR = os.environ.get("SCORING_SIMILAR_DIR", os.path.join(CACHE_DIR, "neighbors"))
+SIMILAR_COMPONENTS = int(os.environ.get("SCORING_SIMILAR_COMPONENTS", 32))
+# Surveillance de la dérive des features et des scores servis (GET /api/drift),
+# désactivable avec SCORING_DRIFT=0 ; profil de référence de X_test conservé dans SCORING_DRIFT_DIR
+DRIFT = os.environ.get("SCORING_DRIFT", "1") == "1"
+DRIFT_DIR = os.environ.get("SCORING_DRIFT_DIR", os.path.join(CACHE_DIR, "drift"))
+# Lignes observées en deçà desquelles aucun niveau de dérive n'est annoncé
+DRIFT_MIN_OBSERVATIONS = int(os.environ.get("SCORING_DRIFT_MIN_OBSERVATIONS", 500))
+# Micro-batching des prédictions en direct (opt-in, SCORING_MICROBATCH=1) : les requêtes
+# concurrentes sont regroupées pendant au plus SCORING_MICROBATCH_WAIT_MS ms ou
+# SCORING_MICROBATCH_MAX_ROWS lignes ; au-delà de SCORING_MICROBATCH_MAX_QUEUE lignes en
+# attente ou de SCORING_MICROBATCH_TIMEOUT secondes d'attente, la requête reçoit un 503
+MICROBATCH = os.environ.get("SCORING_MICROBATCH", "0") == "1"
+MICROBATCH_MAX_ROWS = int(os.environ.get("SCORING_MICROBATCH_MAX_ROWS", 64))
+MICROBATCH_WAIT = float(os.environ.get("SCORING_MICROBATCH_WAIT_MS", 2)) / 1000
+MICROBATCH_MAX_QUEUE = int(os.environ.get("SCORING_MICROBATCH_MAX_QUEUE", 1024))
+MICROBATCH_TIMEOUT = float(os.environ.get("SCORING_MICROBATCH_TIMEOUT", 5))
@@ -8,48 +8,43 @@ import __main__
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-import seaborn as sns
-import joblib
-import pickle
-import shap.explainers
-import shap
-import requests 
-import io
-import zipfile
-from zipfile import ZipFile
-plt.style.use('fivethirtyeight')
-#sns.set_style('darkgrid')
+from model_registry import get_registry
+from feature_store import data_version, load_features, load_raw
+from score_table import load_score_table, table_version
+from explain import load_explainer
+from scoring import SEUIL
+# matplotlib et shap sont importés au premier force plot (plotting.py)
+from plotting import force_plot_figure
 
 
 # Décorateur pour charger les données et le modele en cache
-@st.cache_data()
+# cache_resource : les données sont partagées telles quelles entre les sessions
+# (sans copie, ce qui préserve le mapping mémoire du magasin de features)
+@st.cache_resource()
 def load_data():
-    data_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/X_test.zip"
-    response = requests.get(data_url)
-    with io.BytesIO(response.content) as zip_file:
-        with ZipFile(zip_file, "r") as z:
-            data = pd.read_csv(z.open('X_test.csv'), index_col='SK_ID_CURR', encoding='utf-8')
-            available_ids = data.index.tolist()
-            return data, available_ids
+    data = load_features()
+    available_ids = data.index.tolist()
+    return data, available_ids
 
-@st.cache_data()
+@st.cache_resource()
 def load_raw_data():
-    data_brut_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/X_test_brut.zip"
-    response = requests.get(data_brut_url)
-    with io.BytesIO(response.content) as zip_file:
-        with ZipFile(zip_file, "r") as z:
-            raw_data = pd.read_csv(z.open('X_test_brut.csv'), index_col='SK_ID_CURR', encoding='utf-8')
-            return raw_data
+    raw_data = load_raw()
+    return raw_data
+
+# Le modèle vient du registre partagé (chargé une fois par processus et par version) ;
+# les précalculs qui en dépendent sont mis en cache par empreinte du modèle
+
+# Scores précalculés de tous les clients, recalculés seulement si le modèle ou les données changent
+@st.cache_resource()
+def load_scores(model_checksum, _model, _data):
+    version = table_version(model_checksum, data_version())
+    return load_score_table(lambda X: _model.predict_proba(X)[:, 1], _data, SEUIL, version=version)
 
+# Explainer SHAP unique pour toutes les sessions, avec les valeurs précalculées si elles existent
 @st.cache_resource()
-def load_model():
-    model_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/modele_lgbm_over.pkl"
-    response = requests.get(model_url)
-    model = joblib.load(io.BytesIO(response.content))
-    return model
+def load_shap_explainer(model_checksum, _model, _data):
+    version = table_version(model_checksum, data_version())
+    return load_explainer(_model, _data, version)
 
 def main():
     html_temp = """
@@ -63,7 +58,6 @@ def main():
     # Charger les données et le modèle en cache
     data, available_ids = load_data()
     raw_data = load_raw_data()
-    model = load_model()
     # Changer la couleur du sidebar
     st.markdown(
         """
@@ -104,13 +98,18 @@ def main():
     st.sidebar.write("Montant des biens pour le crédit :", client_raw_data["AMT_GOODS_PRICE"])
     
     if st.button("Prédire"):
+        # Modèle et scores chargés au premier clic (une fois par processus et par version)
+        model_version = get_registry().current()
+        model = model_version.model
+        scores = load_scores(model_version.checksum, model, data)
         # Obtenir les données prétraitées correspondant à l'ID sélectionné pour effectuer la prédiction
         client_data = data.loc[selected_id]
         # Obtenir la valeur de TARGET pour le client sélectionné à partir des données brutes
         target_value = raw_data.loc[selected_id, "TARGET"]
-        # Faire une prédiction avec le modèle
-        prediction_proba = model.predict_proba(client_data.values.reshape(1, -1))[:, 1]
-        prediction = "Refusé" if prediction_proba >= 0.435 else "Accepté"
+        # Lire la prédiction dans la table des scores précalculés
+        proba, denied = scores.lookup(selected_id)
+        prediction_proba = np.array([proba])
+        prediction = "Refusé" if denied else "Accepté"
 
         # Comparer la prédiction avec la vraie valeur de TARGET
         if prediction == "Refusé" and target_value == 1:
@@ -146,14 +145,13 @@ def main():
             else:
                 st.write("La valeur de TARGET réelle indique un défaut de paiement.")
     
-        # Calculer les valeurs SHAP pour le client        
-        explainer = shap.TreeExplainer(model)        
+        # Obtenir les valeurs SHAP du client (précalculées ou via l'explainer partagé)
+        explainer = load_shap_explainer(model_version.checksum, model, data)
+        shap_values_client, expected_value, _ = explainer.row_values(data.index.get_loc(selected_id))
     
         # Afficher l'interprétation SHAP des features        
         st.subheader("Interprétation SHAP des Features")        
-        client_data_df = pd.DataFrame([client_data], columns=client_data.index)
-        shap_values_client = explainer.shap_values(client_data_df)
-        shap.force_plot(explainer.expected_value[1], shap_values_client[1][0], client_data, matplotlib=True)
+        st.pyplot(force_plot_figure(expected_value, shap_values_client, client_data))
        
 
 if __name__ == '__main__':
@@ -7,57 +7,31 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
-import requests
-import shap.explainers
-import shap
-import joblib
-import io
-import urllib.request
-plt.style.use('fivethirtyeight')
+import config
+from api_client import ScoringApiClient
+# matplotlib et shap sont importés au premier force plot (plotting.py)
+from plotting import force_plot_figure
 
-api_base_url = "http://35.181.54.91:5000"    
-model_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/modele_lgbm_over.pkl"
+# Client de l'API partagé par toutes les sessions (connexions conservées, cache par client)
+@st.cache_resource()
+def get_api_client():
+    return ScoringApiClient(config.API_BASE_URL)
 
 # Fonction pour obtenir les IDs clients disponibles depuis l'API
-@st.cache_data()
-def get_available_ids(api_base_url):
-    ids_endpoint = f"{api_base_url}/api/clients"
-    response = requests.get(ids_endpoint)
-    available_ids_data = response.json()
-    available_ids = available_ids_data["available_ids"]
-    return available_ids
-
-# Fonction pour obtenir les données d'un client depuis l'API
-@st.cache_data()
-def get_client_data(selected_id):
-    client_data_endpoint = f"{api_base_url}/api/client/{selected_id}"
-    response = requests.get(client_data_endpoint)
-    client_data = response.json()
-    return client_data
+def get_available_ids():
+    return get_api_client().available_ids()
 
-# Fonction pour obtenir les données prétraitées d'un client depuis l'API
-@st.cache_data(hash_funcs={hash: hash})
-def get_client_preprocessed_data(selected_id):
-    api_url = f"{api_base_url}/api/client_preprocessed/{selected_id}"
-    response = requests.get(api_url)
-    client_preprocessed_data = response.json()
-    columns = list(client_preprocessed_data.keys())  
-    data = pd.DataFrame.from_dict(client_preprocessed_data, orient='index')
-    return data
+# Fonction pour obtenir en parallèle les données brutes et la prédiction d'un client depuis l'API
+# (probabilité lue dans la table des scores précalculés, sans appel au modèle)
+def get_client_bundle(selected_id):
+    bundle = get_api_client().client_bundle(selected_id, parts=("client", "prediction"))
+    return bundle["client"], bundle["prediction"]
 
-# Fonction pour charger le modèle depuis une URL
-@st.cache_resource()
-def load_model(model_url):
-    response = requests.get(model_url)
-    model = joblib.load(io.BytesIO(response.content))
-    return model
+# Fonction pour obtenir l'explication SHAP complète d'un client depuis l'API
+def get_client_explanation(selected_id):
+    return get_api_client().part("explanation", selected_id)
 
 def main():
-    model_url = "https://github.com/babi7777/scoring-model-credit-risk/raw/main/modele_lgbm_over.pkl"
-    
     html_temp = """
     <div style="background-color: #475f4e ; padding:10px; border-radius:10px">
     <h1 style="color: #d9ae13; text-align:center">Dashboard de Prédiction de Crédit</h1>
@@ -92,13 +66,13 @@ def main():
     )
     
     # obtenir les ids
-    available_ids = get_available_ids(api_base_url)
+    available_ids = get_available_ids()
     
     # Sélectionner un ID client dans une liste déroulante
     selected_id = int(st.selectbox("Sélectionner un ID client", available_ids))
 
-    # obtenir les informations du client
-    client_info = get_client_data(selected_id)     
+    # obtenir les informations du client (données brutes et prédiction en une seule série d'appels parallèles)
+    client_info, prediction_data = get_client_bundle(selected_id)
     
     # Afficher les informations du client
     st.sidebar.subheader("Informations du Client")
@@ -108,15 +82,13 @@ def main():
     st.sidebar.write("Montant de l'annuité :", client_info["AMT_ANNUITY"])
     st.sidebar.write("Montant des biens pour le crédit :", client_info["AMT_GOODS_PRICE"])
     
-    # charger les données et le modele en cache
-    client_data = get_client_preprocessed_data(selected_id) 
-    model = load_model(model_url)
+    # Obtenir la valeur de TARGET pour le client sélectionné
+    target_value = client_info["TARGET"]
 
     if st.button("Prédire"):
-                
-        # Faire une prédiction avec le modèle
-        prediction_proba = model.predict_proba(client_data.values.reshape(1, -1))[:, 1]
-        prediction = "Refusé" if prediction_proba >= 0.435 else "Accepté"
+        # Prédiction servie par l'API (même seuil de décision que le reste de l'application)
+        prediction_proba = prediction_data["probability"]
+        prediction = "Refusé" if prediction_data["decision"] == "Denied" else "Accepté"
 
         # Comparer la prédiction avec la vraie valeur de TARGET
         if prediction == "Refusé" and target_value == 1:
@@ -129,12 +101,12 @@ def main():
         # Afficher la prédiction
         st.subheader("Résultat de Prédiction")
         if prediction == "Accepté":
-            st.write(f"Probabilité de Prédiction : {prediction_proba[0]:.4f}")
+            st.write(f"Probabilité de Prédiction : {prediction_proba:.4f}")
             st.markdown(f"<p style='font-size:18px; font-weight:bold; color:green;'>{prediction}</p>", unsafe_allow_html=True)
         else:
-            st.write(f"Probabilité de Prédiction : {prediction_proba[0]:.4f}")
+            st.write(f"Probabilité de Prédiction : {prediction_proba:.4f}")
             st.markdown(f"<p style='font-size:18px; font-weight:bold; color:red;'>{prediction}</p>", unsafe_allow_html=True)
-        st.write(f"Probabilité de Prédiction : {prediction_proba[0]:.4f}")
+        st.write(f"Probabilité de Prédiction : {prediction_proba:.4f}")
                 
         st.write(f"Valeur de TARGET réelle : {target_value}")
 
@@ -152,14 +124,14 @@ def main():
             else:
                 st.write("La valeur de TARGET réelle indique un défaut de paiement.")
     
-        # Calculer les valeurs SHAP pour le client        
-        explainer = shap.TreeExplainer(model)        
+        # Obtenir les valeurs SHAP précalculées par l'API
+        explanation = get_client_explanation(selected_id)
+        shap_values_client = np.array(explanation["shap_values"])
+        client_features = pd.Series(explanation["feature_values"], index=explanation["features"])
     
         # Afficher l'interprétation SHAP des features        
         st.subheader("Interprétation SHAP des Features")        
-        client_data_df = pd.DataFrame([client_data], columns=client_data.index)
-        shap_values_client = explainer.shap_values(client_data_df)
-        shap.force_plot(explainer.expected_value[1], shap_values_client[1][0], client_data, matplotlib=True)
+        st.pyplot(force_plot_figure(explanation["expected_value"], shap_values_client, client_features))
 
 
 if __name__ == '__main__':
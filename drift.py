@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Surveillance de la dérive des features reçues et des scores renvoyés par l'API.
+#   - Profil de référence, calculé une fois sur X_test et conservé sur disque (versionné
+#     comme la table des scores) : pour chaque feature, bornes des déciles, proportion
+#     de valeurs dans chaque intervalle et de valeurs manquantes, moyenne et variance ;
+#     pour le score, même chose sur des intervalles fixes de [0, 1].
+#   - Résumés courants en mémoire constante, mis à jour à chaque prédiction : comptes
+#     par intervalle et moyenne/variance en ligne (Welford, fusion de Chan par paquet).
+#     Une mise à jour est une comparaison vectorisée aux bornes et quelques additions.
+#   - Indicateurs : PSI par feature et pour le score, écart de moyenne en écarts-types
+#     de référence, taux d'acceptation courant.
+# Les résumés sont propres à chaque processus (un par worker gunicorn) et repartent de
+# zéro quand le modèle est remplacé.
+# Les requêtes ne font que déposer leurs lignes dans une file bornée ; un thread du
+# monitor les agrège par paquets (au plus toutes les FLUSH_INTERVAL secondes), hors du
+# chemin de la réponse. File pleine : les lignes sont ignorées et comptées.
+# Tant que moins de SCORING_DRIFT_MIN_OBSERVATIONS lignes ont été observées, les niveaux
+# valent "insufficient_data" : le PSI d'un petit échantillon n'est pas significatif.
+
+import os
+import tempfile
+import threading
+from collections import deque
+
+import numpy as np
+
+import config
+
+# Nombre d'intervalles par feature (déciles) et pour le score
+BINS = 10
+SCORE_BINS = 20
+# Proportion plancher dans le calcul du PSI (intervalles vides)
+PSI_EPSILON = 1e-4
+# Seuils usuels du PSI : stable, dérive modérée, dérive forte
+PSI_LEVELS = ((0.1, "stable"), (0.25, "moderate"), (float("inf"), "significant"))
+# Lignes traitées à la fois lors d'une mise à jour (borne la mémoire des comparaisons)
+UPDATE_CHUNK = 256
+# Agrégation en arrière-plan : dès FLUSH_ROWS lignes en attente ou après FLUSH_INTERVAL
+# secondes ; au-delà de MAX_PENDING_ROWS lignes en attente, les nouvelles sont ignorées
+FLUSH_ROWS = 256
+FLUSH_INTERVAL = 1.0
+MAX_PENDING_ROWS = 10000
+# Niveau des indicateurs calculés sur trop peu d'observations
+INSUFFICIENT = "insufficient_data"
+
+
+# Indice d'intervalle de chaque valeur : nombre de bornes inférieures ou égales, et
+# dernier indice pour les valeurs manquantes. edges : (n_features, n_bornes), complétées par +inf
+def assign_bins(X, edges):
+    bins = (X[:, :, None] >= edges[None, :, :]).sum(axis=2)
+    bins[np.isnan(X)] = edges.shape[1] + 1
+    return bins
+
+
+# Comptes par feature et par intervalle (dernière colonne : valeurs manquantes)
+def bin_counts(X, edges):
+    n_features, n_edges = edges.shape
+    counts = np.zeros((n_features, n_edges + 2), dtype=np.int64)
+    offsets = np.arange(n_features) * (n_edges + 2)
+    for start in range(0, len(X), UPDATE_CHUNK):
+        bins = assign_bins(X[start:start + UPDATE_CHUNK], edges)
+        counts += np.bincount((bins + offsets).ravel(), minlength=counts.size).reshape(counts.shape)
+    return counts
+
+
+# Effectif, moyenne et somme des carrés des écarts par feature, sans les NaN
+def batch_moments(X):
+    valid = ~np.isnan(X)
+    n = valid.sum(axis=0)
+    values = np.where(valid, X, 0.0)
+    mean = np.divide(values.sum(axis=0), n, out=np.zeros(X.shape[1]), where=n > 0)
+    m2 = (np.where(valid, X - mean, 0.0) ** 2).sum(axis=0)
+    return n, mean, m2
+
+
+# Fusion de deux résumés (n, moyenne, M2) : algorithme parallèle de Chan
+def merge_moments(a, b):
+    n_a, mean_a, m2_a = a
+    n_b, mean_b, m2_b = b
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    ratio = np.divide(n_b, n, out=np.zeros(len(n)), where=n > 0)
+    mean = mean_a + delta * ratio
+    m2 = m2_a + m2_b + delta ** 2 * n_a * ratio
+    return n, mean, m2
+
+
+def psi(reference, live):
+    reference = np.maximum(reference, PSI_EPSILON)
+    live = np.maximum(live, PSI_EPSILON)
+    return ((live - reference) * np.log(live / reference)).sum(axis=-1)
+
+
+def psi_level(value, n=None, min_observations=0):
+    if n is not None and n < min_observations:
+        return INSUFFICIENT
+    for limit, level in PSI_LEVELS:
+        if value < limit:
+            return level
+
+
+def proportions(counts):
+    totals = counts.sum(axis=-1, keepdims=True)
+    return np.divide(counts, totals, out=np.zeros(counts.shape), where=totals > 0)
+
+
+class ReferenceProfile:
+    def __init__(self, columns, edges, proportions, mean, var, score_edges, score_proportions,
+                 score_mean, score_var, threshold, approval_rate, version):
+        self.columns = columns
+        self.edges = edges
+        self.proportions = proportions
+        self.mean = mean
+        self.var = var
+        self.score_edges = score_edges
+        self.score_proportions = score_proportions
+        self.score_mean = score_mean
+        self.score_var = score_var
+        # Taux d'acceptation de X_test au seuil de décision du profil (None sans score)
+        self.threshold = threshold
+        self.approval_rate = approval_rate
+        self.version = version
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, columns=np.asarray(self.columns), edges=self.edges, proportions=self.proportions,
+                     mean=self.mean, var=self.var, score_edges=self.score_edges,
+                     score_proportions=self.score_proportions,
+                     score_moments=np.array([self.score_mean, self.score_var]),
+                     approval=np.array([self.threshold, np.nan if self.approval_rate is None else self.approval_rate]))
+        os.replace(tmp, path)
+
+    # None pour un profil enregistré sans taux d'acceptation (à recalculer)
+    @classmethod
+    def open(cls, path, version):
+        with np.load(path) as stored:
+            if "approval" not in stored:
+                return None
+            score_mean, score_var = stored["score_moments"].tolist()
+            threshold, approval_rate = stored["approval"].tolist()
+            return cls(stored["columns"].tolist(), stored["edges"], stored["proportions"], stored["mean"],
+                       stored["var"], stored["score_edges"], stored["score_proportions"],
+                       score_mean, score_var, threshold, None if np.isnan(approval_rate) else approval_rate,
+                       version)
+
+
+def score_edges():
+    return np.linspace(0, 1, SCORE_BINS + 1)[1:-1].reshape(1, -1)
+
+
+# Profil de X_test : bornes des déciles de chaque colonne lues dans la colonne triée,
+# les colonnes étant triées par blocs pour borner la mémoire
+def build_reference(data, probabilities, threshold, version, block=64):
+    X = data.to_numpy()
+    n_features = X.shape[1]
+    levels = np.linspace(0, 1, BINS + 1)[1:-1]
+    edges = np.full((n_features, BINS - 1), np.inf)
+    counts = np.zeros((n_features, BINS + 1), dtype=np.int64)
+    n, mean, m2 = np.zeros(n_features), np.zeros(n_features), np.zeros(n_features)
+    for start in range(0, n_features, block):
+        values = np.asarray(X[:, start:start + block], dtype=np.float64)
+        n[start:start + block], mean[start:start + block], m2[start:start + block] = batch_moments(values)
+        sorted_block = np.sort(values, axis=0)
+        for j in range(sorted_block.shape[1]):
+            column = sorted_block[:, j]
+            column = column[:len(column) - np.isnan(column).sum()]
+            feature = start + j
+            if len(column):
+                unique = np.unique(column[(levels * (len(column) - 1)).astype(np.int64)])
+                edges[feature, :len(unique)] = unique
+            below = np.searchsorted(column, edges[feature], side="left")
+            counts[feature, :BINS] = np.diff(np.concatenate([[0], below, [len(column)]]))
+            counts[feature, BINS] = len(sorted_block) - len(column)
+    probabilities = np.asarray(probabilities, dtype=np.float64).reshape(-1, 1)
+    score_counts = bin_counts(probabilities, score_edges())
+    score_n, score_mean, score_m2 = batch_moments(probabilities)
+    return ReferenceProfile(
+        data.columns.tolist(), edges, proportions(counts), mean,
+        np.divide(m2, n, out=np.zeros(n_features), where=n > 0),
+        score_edges(), proportions(score_counts), float(score_mean[0]),
+        float(score_m2[0] / score_n[0]) if score_n[0] else 0.0, threshold,
+        float((probabilities < threshold).mean()) if len(probabilities) else None, version,
+    )
+
+
+def reference_path(version, drift_dir=None):
+    return os.path.join(drift_dir or config.DRIFT_DIR, f"drift-{version}.npz")
+
+
+# Profil de la version courante : lu sur disque, ou calculé et enregistré.
+# scores : fonction renvoyant les probabilités de X_test, appelée seulement si le
+# profil doit être calculé (le scoring complet n'a pas lieu quand il existe déjà)
+def load_reference(data, scores, threshold, version, drift_dir=None):
+    path = reference_path(version, drift_dir)
+    if os.path.exists(path):
+        reference = ReferenceProfile.open(path, version)
+        if reference is not None and reference.columns == data.columns.tolist() and reference.threshold == threshold:
+            return reference
+    reference = build_reference(data, scores(), threshold, version)
+    reference.save(path)
+    return reference
+
+
+class DriftMonitor:
+    def __init__(self, reference, threshold, min_observations=None):
+        self.reference = reference
+        self.threshold = threshold
+        self.min_observations = config.DRIFT_MIN_OBSERVATIONS if min_observations is None else min_observations
+        self._lock = threading.Lock()
+        # File des lignes observées en attente d'agrégation : (X, probabilités)
+        self._condition = threading.Condition()
+        self._pending = deque()
+        self._pending_rows = 0
+        self._thread = None
+        self._closed = False
+        self.dropped = 0
+        self.reset()
+
+    def reset(self):
+        n_features, n_edges = self.reference.edges.shape
+        with self._condition:
+            self._pending.clear()
+            self._pending_rows = 0
+            self.dropped = 0
+        with self._lock:
+            self.n = 0
+            self.accepted = 0
+            self.counts = np.zeros((n_features, n_edges + 2), dtype=np.int64)
+            self.moments = (np.zeros(n_features), np.zeros(n_features), np.zeros(n_features))
+            self.score_counts = np.zeros((1, SCORE_BINS + 1), dtype=np.int64)
+            self.score_moments = (np.zeros(1), np.zeros(1), np.zeros(1))
+
+    def _ensure_thread(self):
+        # Démarré à la première observation, donc dans chaque worker (un thread ne
+        # survit pas au fork de gunicorn --preload)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="drift-monitor", daemon=True)
+            self._thread.start()
+
+    # Prise en compte des lignes X scorées avec les probabilités données : simple dépôt
+    # dans la file, l'agrégation se fait en arrière-plan
+    def observe(self, X, probabilities):
+        # Copies : X peut être une vue sur la matrice partagée de l'API
+        X = np.array(X, dtype=np.float64).reshape(-1, len(self.reference.columns))
+        probabilities = np.array(probabilities, dtype=np.float64).reshape(-1)
+        with self._condition:
+            if self._closed:
+                return
+            if self._pending_rows + len(X) > MAX_PENDING_ROWS:
+                self.dropped += len(X)
+                return
+            self._ensure_thread()
+            self._pending.append((X, probabilities))
+            self._pending_rows += len(X)
+            if self._pending_rows >= FLUSH_ROWS:
+                self._condition.notify()
+
+    # Appelé sous le verrou de la file
+    def _drain(self):
+        items = list(self._pending)
+        self._pending.clear()
+        self._pending_rows = 0
+        return items
+
+    # Arrête le thread (monitor remplacé avec le modèle)
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                if self._pending_rows < FLUSH_ROWS:
+                    self._condition.wait(FLUSH_INTERVAL)
+                items = self._drain()
+            self._update(items)
+
+    # Agrège immédiatement les lignes en attente (avant un rapport)
+    def flush(self):
+        with self._condition:
+            items = self._drain()
+        self._update(items)
+
+    def _update(self, items):
+        if not items:
+            return
+        X = np.concatenate([X for X, _ in items])
+        probabilities = np.concatenate([p for _, p in items]).reshape(-1, 1)
+        # Calculs hors verrou : seules les additions finales sont sérialisées
+        counts = bin_counts(X, self.reference.edges)
+        moments = batch_moments(X)
+        score_counts = bin_counts(probabilities, self.reference.score_edges)
+        score_moments = batch_moments(probabilities)
+        accepted = int((probabilities < self.threshold).sum())
+        with self._lock:
+            self.n += len(X)
+            self.accepted += accepted
+            self.counts += counts
+            self.moments = merge_moments(self.moments, moments)
+            self.score_counts += score_counts
+            self.score_moments = merge_moments(self.score_moments, score_moments)
+
+    def report(self, top=20):
+        self.flush()
+        with self._lock:
+            n, accepted = self.n, self.accepted
+            counts, (feature_n, mean, _) = self.counts.copy(), self.moments
+            score_counts, (score_n, score_mean, score_m2) = self.score_counts.copy(), self.score_moments
+        reference = self.reference
+        result = {"version": reference.version, "n_observed": n, "n_dropped": self.dropped,
+                  "min_observations": self.min_observations,
+                  "psi_levels": dict((level, limit) for limit, level in PSI_LEVELS[:-1])}
+        if not n:
+            return {**result, "score": None, "features": [], "summary": {}}
+
+        feature_psi = psi(reference.proportions, proportions(counts))
+        std = np.sqrt(reference.var)
+        shift = np.divide(mean - reference.mean, std, out=np.zeros(len(std)), where=(std > 0) & (feature_n > 0))
+        missing = counts[:, -1] / n
+        order = np.argsort(-feature_psi, kind="stable")[:top]
+        levels = [psi_level(value, n, self.min_observations) for value in feature_psi.tolist()]
+        score_psi = float(psi(reference.score_proportions, proportions(score_counts))[0])
+        return {
+            **result,
+            "score": {
+                "psi": score_psi,
+                "level": psi_level(score_psi, n, self.min_observations),
+                "mean": float(score_mean[0]),
+                "reference_mean": reference.score_mean,
+                "std": float(np.sqrt(score_m2[0] / score_n[0])) if score_n[0] else 0.0,
+                "reference_std": float(np.sqrt(reference.score_var)),
+                "approval_rate": accepted / n,
+                "reference_approval_rate": reference.approval_rate,
+            },
+            "summary": {level: levels.count(level) for level in [*(level for _, level in PSI_LEVELS), INSUFFICIENT]},
+            "features": [
+                {
+                    "feature": reference.columns[i],
+                    "psi": float(feature_psi[i]),
+                    "level": levels[i],
+                    "mean_shift_std": float(shift[i]),
+                    "missing_rate": float(missing[i]),
+                    "reference_missing_rate": float(reference.proportions[i, -1]),
+                }
+                for i in order.tolist()
+            ],
+        }
+
+
+# scores : fonction renvoyant les probabilités de X_test (voir load_reference)
+def load_monitor(data, scores, threshold, version, drift_dir=None):
+    return DriftMonitor(load_reference(data, scores, threshold, version, drift_dir), threshold)
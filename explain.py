@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Service d'explications SHAP.
+# Un seul TreeExplainer est construit par processus. Les valeurs SHAP de tout X_test
+# sont calculées une fois par paquets et stockées en float32 (values.npy, ouvert en
+# memmap) avec, pour chaque client, les indices des SHAP_TOP_K contributions les plus
+# fortes en valeur absolue (top_k.npy). Le répertoire est versionné par les empreintes
+# du modèle et des données, comme la table des scores.
+#
+# Calcul hors ligne : python explain.py
+
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import config
+
+VALUES_FILE = "values.npy"
+TOP_K_FILE = "top_k.npy"
+META_FILE = "meta.json"
+
+
+# Valeurs SHAP et valeur de base de la classe positive, quel que soit le format renvoyé par shap
+def positive_class(shap_values, expected_value):
+    if isinstance(shap_values, list):
+        shap_values = shap_values[-1]
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 3:
+        shap_values = shap_values[..., -1]
+    expected_value = np.atleast_1d(expected_value)
+    return shap_values, float(expected_value[-1])
+
+
+def top_k_indices(values, k):
+    k = min(k, values.shape[1])
+    top = np.argpartition(-np.abs(values), k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.abs(np.take_along_axis(values, top, axis=1)), axis=1)
+    return np.take_along_axis(top, order, axis=1).astype(np.int32)
+
+
+class Explainer:
+    def __init__(self, model, data, version, precomputed_dir=None):
+        self.model = model
+        self.data = data
+        self.columns = data.columns.tolist()
+        self.version = version
+        self._explainer = None
+        self.values = None
+        self.top_k = None
+        self.expected_value = None
+        if precomputed_dir:
+            self._open(precomputed_dir)
+
+    @property
+    def explainer(self):
+        # Construit au premier besoin puis conservé pour toute la durée du processus
+        if self._explainer is None:
+            import shap
+            self._explainer = shap.TreeExplainer(self.model)
+        return self._explainer
+
+    def _open(self, directory):
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.expected_value = meta["expected_value"]
+        self.values = np.load(os.path.join(directory, VALUES_FILE), mmap_mode="r")
+        self.top_k = np.load(os.path.join(directory, TOP_K_FILE), mmap_mode="r")
+
+    @property
+    def precomputed(self):
+        return self.values is not None
+
+    # Valeurs SHAP (float32) des lignes X, calculées par paquets
+    def compute(self, X, chunk_size=2000):
+        values = np.empty(X.shape, dtype=np.float32)
+        expected_value = None
+        for start in range(0, len(X), chunk_size):
+            chunk, expected_value = positive_class(
+                self.explainer.shap_values(np.asarray(X[start:start + chunk_size], dtype=np.float64)),
+                self.explainer.expected_value,
+            )
+            values[start:start + chunk_size] = chunk
+        if expected_value is None:
+            _, expected_value = positive_class(np.empty((0, X.shape[1])), self.explainer.expected_value)
+        return values, expected_value
+
+    # Valeurs SHAP d'une ligne de X_test (par position), précalculées ou calculées à la volée
+    def row_values(self, position):
+        if self.precomputed:
+            return np.asarray(self.values[position]), self.expected_value, self.top_k[position]
+        values, expected_value = self.compute(self.data.iloc[[position]].to_numpy())
+        return values[0], expected_value, None
+
+    def explain(self, position, k=10, full=False):
+        values, expected_value, top = self.row_values(position)
+        return self._result(position, values, expected_value, top, k, full)
+
+    # Explications de plusieurs lignes : un seul appel vectorisé à shap si rien n'est précalculé
+    def explain_many(self, positions, k=10):
+        if self.precomputed or not positions:
+            return [self.explain(position, k=k) for position in positions]
+        values, expected_value = self.compute(self.data.iloc[positions].to_numpy())
+        return [self._result(position, row, expected_value, None, k, False) for position, row in zip(positions, values)]
+
+    def _result(self, position, values, expected_value, top, k, full):
+        if top is None or k > len(top):
+            top = top_k_indices(values.reshape(1, -1), k)[0]
+        top = top[:k]
+        feature_values = self.data.iloc[position].to_numpy()
+        result = {
+            "expected_value": expected_value,
+            "contributions": [
+                {"feature": self.columns[i], "shap_value": float(values[i]), "feature_value": float(feature_values[i])}
+                for i in top.tolist()
+            ],
+        }
+        if full:
+            result["features"] = self.columns
+            result["shap_values"] = values.astype(np.float64).tolist()
+            result["feature_values"] = feature_values.astype(np.float64).tolist()
+        return result
+
+
+def shap_path(version, shap_dir=None):
+    return os.path.join(shap_dir or config.SHAP_DIR, f"shap-{version}")
+
+
+# Calcule et enregistre les valeurs SHAP de toutes les lignes de data
+def build_explanations(explainer, shap_dir=None, chunk_size=2000, top_k=None):
+    directory = shap_path(explainer.version, shap_dir)
+    values, expected_value = explainer.compute(explainer.data.to_numpy(), chunk_size)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".shap-")
+    try:
+        np.save(os.path.join(tmp_dir, VALUES_FILE), values)
+        np.save(os.path.join(tmp_dir, TOP_K_FILE), top_k_indices(values, top_k or config.SHAP_TOP_K))
+        with open(os.path.join(tmp_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"expected_value": expected_value, "columns": explainer.columns,
+                       "ids": len(values), "version": explainer.version}, f)
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.replace(tmp_dir, directory)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return directory
+
+
+# Explainer de la version courante : valeurs précalculées si elles existent,
+# calculées maintenant si precompute est vrai, sinon calcul à la volée par client
+def load_explainer(model, data, version, precompute=False, shap_dir=None):
+    directory = shap_path(version, shap_dir)
+    if not os.path.exists(directory) and precompute:
+        build_explanations(Explainer(model, data, version), shap_dir)
+    if os.path.exists(directory):
+        return Explainer(model, data, version, precomputed_dir=directory)
+    return Explainer(model, data, version)
+
+
+if __name__ == '__main__':
+    from feature_store import data_version, load_features
+    from model_registry import get_registry
+    from score_table import table_version
+
+    model_version = get_registry().current()
+    data = load_features()
+    explainer = Explainer(model_version.model, data, table_version(model_version.checksum, data_version()))
+    print(build_explanations(explainer))
@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Magasin de features binaire, construit une fois à partir des CSV zippés :
+#   features.npy   matrice des données prétraitées (ouverte en memmap), en float32
+#                  si le compactage a vérifié que les prédictions n'en changent pas
+#   ids.npy        SK_ID_CURR de chaque ligne, dans l'ordre de la matrice
+#   raw.parquet    données brutes compactées au format colonnaire
+#   manifest.json  colonnes, dimensions, rapport de compactage et empreintes des sources
+# Ouverte en lecture seule avec mmap, la matrice est partagée par tous les workers
+# via le cache de pages du système au lieu d'être copiée dans chaque processus.
+#
+# Construction : python feature_store.py [--force]
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+
+import config
+from artifacts import artifact_checksum, artifact_path, DATA_ARTIFACT, RAW_DATA_ARTIFACT, MODEL_ARTIFACT
+from compaction import compact_features, compact_raw
+
+FEATURES_FILE = "features.npy"
+IDS_FILE = "ids.npy"
+RAW_FILE = "raw.parquet"
+MANIFEST_FILE = "manifest.json"
+
+
+def read_data_csv():
+    with ZipFile(artifact_path(DATA_ARTIFACT), "r") as z:
+        return pd.read_csv(z.open('X_test.csv'), index_col='SK_ID_CURR', encoding='utf-8')
+
+
+def read_raw_csv():
+    with ZipFile(artifact_path(RAW_DATA_ARTIFACT), "r") as z:
+        return pd.read_csv(z.open('X_test_brut.csv'), index_col='SK_ID_CURR', encoding='utf-8')
+
+
+def read_manifest(store_dir=None):
+    path = os.path.join(store_dir or config.STORE_DIR, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def source_checksums():
+    names = (DATA_ARTIFACT, RAW_DATA_ARTIFACT)
+    # Le passage en float32 est vérifié avec le modèle : un nouveau modèle impose de le revérifier
+    if config.COMPACT:
+        names += (MODEL_ARTIFACT,)
+    return {name: artifact_checksum(name) for name in names}
+
+
+# Prédicteur du modèle courant, qui sert à vérifier le passage des features en float32
+def _verification_predictor():
+    from scoring import load_model
+    from tree_engine import make_predictor
+    return make_predictor(load_model(), config.INFERENCE_BACKEND)
+
+
+# Manifeste du magasin s'il a été construit à partir des sources actuelles ; un
+# magasin périmé (archive ou modèle remplacé depuis) est ignoré
+def current_manifest(store_dir=None):
+    manifest = read_manifest(store_dir)
+    if manifest and manifest["sources"] == source_checksums():
+        return manifest
+    return None
+
+
+# Compactage des frames lues depuis les CSV
+def compact_frames(data, raw_data):
+    from scoring import SEUIL
+    data, features_report = compact_features(data, _verification_predictor(), SEUIL)
+    raw_data, raw_report = compact_raw(raw_data)
+    return data, raw_data, {"features": features_report, "raw": raw_report}
+
+
+def build_store(store_dir=None, force=False):
+    store_dir = store_dir or config.STORE_DIR
+    sources = source_checksums()
+    manifest = read_manifest(store_dir)
+    if manifest and manifest["sources"] == sources and not force:
+        return manifest
+
+    data, raw_data = read_data_csv(), read_raw_csv()
+    compaction = None
+    if config.COMPACT:
+        data, raw_data, compaction = compact_frames(data, raw_data)
+    parent = os.path.dirname(os.path.abspath(store_dir))
+    os.makedirs(parent, exist_ok=True)
+    # Écriture dans un répertoire temporaire puis remplacement, pour ne jamais
+    # exposer un magasin incomplet aux processus qui l'ouvrent
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=".store-")
+    try:
+        features = data.to_numpy()
+        np.save(os.path.join(tmp_dir, FEATURES_FILE), features)
+        np.save(os.path.join(tmp_dir, IDS_FILE), data.index.to_numpy(dtype=np.int64))
+        raw_data.to_parquet(os.path.join(tmp_dir, RAW_FILE))
+        manifest = {
+            "columns": data.columns.tolist(),
+            "shape": list(data.shape),
+            "dtype": features.dtype.name,
+            "raw_columns": raw_data.columns.tolist(),
+            "sources": sources,
+            "compaction": compaction,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        if os.path.exists(store_dir):
+            old_dir = tempfile.mkdtemp(dir=parent, prefix=".store-old-")
+            os.replace(store_dir, os.path.join(old_dir, "store"))
+            os.replace(tmp_dir, store_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        else:
+            os.replace(tmp_dir, store_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return manifest
+
+
+def open_features(store_dir=None):
+    store_dir = store_dir or config.STORE_DIR
+    manifest = read_manifest(store_dir)
+    matrix = np.load(os.path.join(store_dir, FEATURES_FILE), mmap_mode="r")
+    ids = np.load(os.path.join(store_dir, IDS_FILE))
+    # copy=False : le DataFrame est une vue sur la matrice mappée, sans copie
+    return pd.DataFrame(matrix, index=pd.Index(ids, name='SK_ID_CURR'), columns=manifest["columns"], copy=False)
+
+
+def open_raw(store_dir=None):
+    store_dir = store_dir or config.STORE_DIR
+    return pd.read_parquet(os.path.join(store_dir, RAW_FILE), memory_map=True)
+
+
+# Empreinte des données prétraitées effectivement servies (magasin binaire ou CSV)
+def data_version():
+    manifest = current_manifest()
+    if manifest:
+        return f"{manifest['sources'][DATA_ARTIFACT]}-{manifest['dtype']}"
+    return artifact_checksum(DATA_ARTIFACT)
+
+
+# Avec le compactage, un magasin absent ou périmé est construit une fois : la
+# vérification du float32 avec le modèle n'a lieu qu'à la construction, et non à
+# chaque chargement. None si le répertoire du magasin n'est pas accessible en écriture.
+def _store_for_loading():
+    manifest = current_manifest()
+    if manifest or not config.COMPACT:
+        return manifest
+    try:
+        return build_store()
+    except OSError:
+        return None
+
+
+# Points d'entrée communs : le magasin binaire, sinon les CSV zippés (features en
+# float64, non vérifiées en float32)
+def load_features():
+    if _store_for_loading():
+        return open_features()
+    return read_data_csv()
+
+
+def load_raw():
+    if _store_for_loading():
+        return open_raw()
+    raw_data = read_raw_csv()
+    if config.COMPACT:
+        raw_data, _ = compact_raw(raw_data)
+    return raw_data
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convertit X_test/X_test_brut en magasin de features binaire")
+    parser.add_argument("--store-dir", default=config.STORE_DIR)
+    parser.add_argument("--force", action="store_true", help="reconstruit même si les sources n'ont pas changé")
+    args = parser.parse_args()
+    manifest = build_store(args.store_dir, force=args.force)
+    print(f"{args.store_dir}: {manifest['shape'][0]} lignes x {manifest['shape'][1]} features ({manifest['dtype']})")
+    for name, report in (manifest["compaction"] or {}).items():
+        print(f"  {name} : {report['before_bytes'] / 2**20:.1f} Mo -> {report['after_bytes'] / 2**20:.1f} Mo")
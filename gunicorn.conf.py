@@ -0,0 +1,48 @@
+# Configuration gunicorn de l'API de scoring.
+# preload_app : les données, le modèle et les précalculs sont chargés une seule fois
+# dans le processus maître puis partagés en copie sur écriture par les workers.
+# Le maître appelle le modèle avant le fork (table des scores, vérification du
+# float32) ; LightGBM documente qu'un pool de threads OpenMP créé avant un fork peut
+# bloquer les prédictions suivantes dans les processus fils. Avec le préchargement,
+# les prédictions sont donc limitées à un thread OpenMP (fixé ici, avant que config
+# et LightGBM ne soient chargés ; le n_jobs enregistré avec le modèle est ignoré) :
+# le parallélisme vient des workers et de leurs threads. SCORING_PRELOAD=0 désactive
+# le préchargement (chaque worker charge alors ses propres données).
+
+import gc
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+preload_app = os.environ.get("SCORING_PRELOAD", "1") == "1"
+if preload_app:
+    os.environ["OMP_NUM_THREADS"] = "1"
+    os.environ["SCORING_PREDICT_THREADS"] = "1"
+workers = int(os.environ.get("SCORING_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("SCORING_THREADS", 4))
+worker_class = "gthread"
+# Arrêt propre : les requêtes en cours disposent de graceful_timeout secondes après SIGTERM
+graceful_timeout = int(os.environ.get("SCORING_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("SCORING_WORKER_TIMEOUT", 120))
+keepalive = 5
+accesslog = "-"
+
+
+# Threads du processus (Linux), y compris ceux d'OpenMP que le module threading ne voit pas
+def _native_threads():
+    try:
+        return len(os.listdir("/proc/self/task"))
+    except OSError:
+        return None
+
+
+def when_ready(server):
+    # Appelé dans le maître avant le lancement des workers : aucun autre thread ne
+    # doit exister au moment du fork
+    threads = _native_threads()
+    if preload_app and threads and threads > 1:
+        server.log.warning("%d threads alive in the master before fork; forked workers may hang in LightGBM", threads)
+    # Les objets chargés au préchargement passent dans la génération permanente du
+    # ramasse-miettes : les workers ne les parcourent plus, ce qui évite de toucher
+    # (donc de copier) les pages partagées
+    gc.freeze()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Index SK_ID_CURR -> position de ligne, construit une fois au chargement.
+# Remplace les tests `id in available_ids` (parcours linéaire d'une liste) et les
+# accès `.loc` par une table de hachage et un accès positionnel dans les tableaux NumPy.
+
+import numpy as np
+
+
+class IdIndex:
+    def __init__(self, ids):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self._positions = {client_id: position for position, client_id in enumerate(self.ids.tolist())}
+        if len(self._positions) != len(self.ids):
+            raise ValueError("SK_ID_CURR values must be unique")
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, client_id):
+        return client_id in self._positions
+
+    # Position de la ligne du client, None s'il est inconnu
+    def position(self, client_id):
+        return self._positions.get(client_id)
+
+    # Positions d'une liste d'ID, -1 pour les ID inconnus
+    def positions(self, client_ids):
+        get = self._positions.get
+        return np.fromiter((get(client_id, -1) for client_id in client_ids), dtype=np.int64, count=len(client_ids))
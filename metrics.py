@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Métriques de l'API au format texte de Prometheus, sans dépendance externe.
+# Compteurs, histogrammes et jauges sont protégés par un verrou chacun ; une
+# observation coûte une recherche dichotomique et quelques additions, assez peu
+# pour rester active en charge. Les métriques sont propres à chaque processus :
+# avec plusieurs workers gunicorn, chaque worker expose les siennes.
+# Le profileur par échantillonnage (SCORING_PROFILER=1) relève périodiquement la
+# pile de chaque thread et restitue les piles au format « folded » (flame graphs).
+
+import bisect
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter as _Counter
+
+# Bornes (secondes) adaptées à des latences de la microseconde à la seconde
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Bornes (nombre de lignes) des tailles de lot
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    # function : si fournie, la valeur est lue au moment de l'export
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+        self._function = function
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        if self._function is not None:
+            return self.header() + [f"{self.name} {_format_value(self._function())}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labels, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # par jeu d'étiquettes : [compte par intervalle (+ dépassement), somme, nombre]
+        self._series = {}
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def resident_memory_bytes():
+    # /proc/self/statm : la deuxième valeur est la mémoire résidente en pages
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_resident_memory_bytes()
+
+
+def peak_resident_memory_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.register(Counter(
+    "scoring_requests_total", "Requêtes HTTP traitées, par point d'entrée et code de statut", ("endpoint", "status")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "scoring_request_duration_seconds", "Durée des requêtes HTTP par point d'entrée", ("endpoint",)))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "scoring_stage_duration_seconds", "Durée des étapes du traitement (recherche, inférence, sérialisation...)", ("stage",)))
+INFERENCES = REGISTRY.register(Counter(
+    "scoring_model_inferences_total", "Appels au modèle"))
+INFERENCE_ROWS = REGISTRY.register(Counter(
+    "scoring_model_rows_total", "Lignes évaluées par le modèle"))
+MICROBATCH_ROWS = REGISTRY.register(Histogram(
+    "scoring_microbatch_rows", "Lignes par appel groupé du micro-batching", buckets=ROW_BUCKETS))
+MICROBATCH_QUEUE_SECONDS = REGISTRY.register(Histogram(
+    "scoring_microbatch_queue_seconds", "Attente en file des requêtes avant l'appel groupé au modèle"))
+MICROBATCH_QUEUE_ROWS = REGISTRY.register(Gauge(
+    "scoring_microbatch_queue_rows", "Lignes en attente dans la file du micro-batching"))
+MICROBATCH_REJECTED = REGISTRY.register(Counter(
+    "scoring_microbatch_rejected_total", "Requêtes refusées, file du micro-batching pleine ou délai dépassé", ("reason",)))
+REGISTRY.register(Gauge(
+    "process_resident_memory_bytes", "Mémoire résidente du processus", function=resident_memory_bytes))
+REGISTRY.register(Gauge(
+    "process_peak_resident_memory_bytes", "Pic de mémoire résidente du processus", function=peak_resident_memory_bytes))
+
+
+# Chronomètre d'une étape : with stage("lookup"): ...
+def stage(name):
+    return STAGE_SECONDS.time(name)
+
+
+# Enveloppe une fonction de prédiction pour compter les appels et mesurer l'inférence
+def instrument_predictor(predict):
+    def instrumented(X):
+        with STAGE_SECONDS.time("inference"):
+            result = predict(X)
+        INFERENCES.inc()
+        INFERENCE_ROWS.inc(amount=len(result))
+        return result
+    return instrumented
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = _Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(stack)))
+            with self._lock:
+                self.samples.update(stacks)
+
+    # Piles au format « folded » : une ligne « pile nombre_d'échantillons »
+    def folded(self, reset=False):
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+            if reset:
+                self.samples.clear()
+        return "\n".join(lines) + "\n"
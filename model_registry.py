@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Registre des modèles, unique par processus et partagé par l'API, les dashboards et
+# les outils en ligne de commande.
+#   - chaque version du modèle est chargée une seule fois, mémorisée par son empreinte ;
+#   - avec SCORING_MODEL_HOT_SWAP=1, l'artefact est revérifié toutes les
+#     SCORING_MODEL_CHECK_INTERVAL secondes et une nouvelle version remplace
+#     l'ancienne en une seule affectation (les appels en cours gardent l'ancienne) ;
+#   - les métadonnées de la version courante sont disponibles via metadata().
+
+import datetime
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from artifacts import artifact_checksum, artifact_path, MODEL_ARTIFACT
+
+# Nombre de versions conservées en mémoire (la courante et la précédente)
+MAX_VERSIONS = 2
+
+logger = logging.getLogger(__name__)
+
+
+class ModelVersion:
+    def __init__(self, model, checksum, source):
+        self.model = model
+        self.checksum = checksum
+        self.source = source
+        self.loaded_at = datetime.datetime.now(datetime.timezone.utc)
+
+    def metadata(self):
+        booster = getattr(self.model, "booster_", None)
+        return {
+            "checksum": self.checksum,
+            "source": self.source,
+            "loaded_at": self.loaded_at.isoformat(),
+            "model_class": type(self.model).__name__,
+            "n_features": booster.num_feature() if booster is not None else None,
+            "n_trees": booster.num_trees() if booster is not None else None,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, name=MODEL_ARTIFACT, hot_swap=None, check_interval=None):
+        self.name = name
+        self.hot_swap = config.MODEL_HOT_SWAP if hot_swap is None else hot_swap
+        self.check_interval = config.MODEL_CHECK_INTERVAL if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._versions = OrderedDict()
+        self._current = None
+        self._last_check = 0.0
+        self._listeners = []
+        self._watcher = None
+
+    # refresh : revalidation explicite de l'artefact auprès du serveur (remplacement à chaud)
+    def _load_version(self, refresh=False):
+        path = artifact_path(self.name, refresh)
+        checksum = artifact_checksum(self.name)
+        version = self._versions.get(checksum)
+        if version is None:
+            # joblib (et lightgbm, au dépickage) n'est importé qu'au premier chargement d'un modèle
+            import joblib
+            version = ModelVersion(joblib.load(path), checksum, path)
+        return version
+
+    def _install(self, version):
+        self._versions[version.checksum] = version
+        self._versions.move_to_end(version.checksum)
+        while len(self._versions) > MAX_VERSIONS:
+            self._versions.popitem(last=False)
+        self._last_check = time.monotonic()
+        # Affectation atomique : les lecteurs voient l'ancienne ou la nouvelle version
+        self._current = version
+
+    # Version courante, chargée au premier appel ; en mode remplacement à chaud,
+    # l'artefact est revérifié lorsque l'intervalle est écoulé
+    def current(self):
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self._install(self._load_version())
+        elif self.hot_swap and time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh(blocking=False)
+        return self._current
+
+    def get(self):
+        return self.current().model
+
+    def metadata(self):
+        return self.current().metadata()
+
+    # Recharge l'artefact s'il a changé ; renvoie True si la version a été remplacée
+    def refresh(self, blocking=True):
+        if not self._lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._last_check = time.monotonic()
+            previous = self._current
+            version = self._load_version(refresh=True)
+            if previous is not None and version.checksum == previous.checksum:
+                return False
+            self._install(version)
+        finally:
+            self._lock.release()
+        for listener in self._listeners:
+            listener(version)
+        return True
+
+    # Appelle listener(version) à chaque remplacement du modèle
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    # Surveillance en arrière-plan ; à appeler dans chaque processus (un thread ne survit pas au fork)
+    def ensure_watching(self):
+        if not self.hot_swap or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Model refresh failed")
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
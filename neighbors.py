@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Index des clients similaires, construit une fois sur X_test puis conservé sur disque :
+#   - chaque feature est centrée-réduite (valeurs manquantes remplacées par la moyenne,
+#     c'est-à-dire 0 après réduction) ;
+#   - la matrice réduite est projetée par ACP sur SIMILAR_COMPONENTS axes (0 = pas de
+#     projection), ce qui garde un BallTree efficace malgré le nombre de features ;
+#   - les plus proches voisins (distance euclidienne dans l'espace projeté) sont
+#     obtenus par un BallTree (sklearn) en quelques millisecondes.
+# Le fichier est nommé d'après l'empreinte des données et le nombre d'axes.
+#
+# Construction et vérification contre la recherche exhaustive :
+#   python neighbors.py [--check 200] [--k 10]
+
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+import numpy as np
+
+import config
+
+
+class NeighborIndex:
+    def __init__(self, ids, mean, scale, components, tree, version):
+        self.ids = ids
+        self.mean = mean
+        self.scale = scale
+        # Axes de l'ACP (n_axes x n_features), None sans projection
+        self.components = components
+        self.tree = tree
+        self.version = version
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Points indexés (lignes de X_test dans l'espace de recherche), sans copie
+    @property
+    def points(self):
+        return self.tree.get_arrays()[0]
+
+    def standardize(self, X):
+        X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        return np.where(np.isnan(X), 0.0, X)
+
+    # Lignes de features -> espace de recherche
+    def transform(self, X):
+        X = self.standardize(X)
+        if self.components is not None:
+            X = X @ self.components.T
+        return X
+
+    # (distances, positions) des k plus proches lignes indexées pour chaque ligne de X
+    def query(self, X, k):
+        return self.tree.query(self.transform(X), k=min(k, len(self)))
+
+    # k plus proches voisins d'une ligne de X_test (par position), elle-même exclue
+    def similar(self, position, k):
+        distances, positions = self.tree.query(self.points[position:position + 1], k=min(k + 1, len(self)))
+        distances, positions = distances[0], positions[0]
+        keep = positions != position
+        if keep.all():
+            # Doublons exacts : la ligne elle-même peut ne pas être renvoyée, on retire le plus lointain
+            keep[-1] = False
+        return distances[keep][:k], positions[keep][:k]
+
+
+def index_version(data_checksum, n_components):
+    return f"{data_checksum[:16]}-{n_components}"
+
+
+def index_path(version, index_dir=None):
+    return os.path.join(index_dir or config.SIMILAR_DIR, f"neighbors-{version}.pkl")
+
+
+def build_index(data, version, n_components=None):
+    from sklearn.neighbors import BallTree
+
+    n_components = config.SIMILAR_COMPONENTS if n_components is None else n_components
+    # Lecture seule : la matrice peut être celle de l'API (ou un memmap), jamais modifiée ici
+    features = np.asarray(data.to_numpy(), dtype=np.float64)
+    mean = np.nanmean(features, axis=0)
+    std = np.nanstd(features, axis=0)
+    # Colonnes constantes ou entièrement vides : laissées à 0 après réduction
+    mean = np.where(np.isnan(mean), 0.0, mean)
+    scale = np.where(np.isnan(std) | (std == 0), 1.0, std)
+    # Nouveau tableau : la réduction ne touche pas aux features de l'appelant
+    X = (features - mean) / scale
+    X[np.isnan(X)] = 0.0
+    components = None
+    if 0 < n_components < X.shape[1]:
+        # Les colonnes sont déjà centrées : les axes principaux sont les vecteurs singuliers
+        _, _, vt = np.linalg.svd(X, full_matrices=False)
+        components = vt[:n_components]
+        X = X @ components.T
+    tree = BallTree(X)
+    return NeighborIndex(data.index.to_numpy(dtype=np.int64), mean, scale, components, tree, version)
+
+
+# Index de la version courante des données : lu sur disque, ou construit et enregistré
+def load_neighbor_index(data, data_checksum, n_components=None, index_dir=None):
+    n_components = config.SIMILAR_COMPONENTS if n_components is None else n_components
+    version = index_version(data_checksum, n_components)
+    path = index_path(version, index_dir)
+    ids = data.index.to_numpy(dtype=np.int64)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            index = pickle.load(f)
+        if np.array_equal(index.ids, ids):
+            return index
+
+    index = build_index(data, version, n_components)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".pkl")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return index
+
+
+# Comparaison avec la recherche exhaustive sur n_queries clients tirés au hasard :
+#   - exact : part des requêtes dont les distances sont celles du parcours complet de
+#     l'espace de recherche (1.0 attendu, les égalités de distance étant admises) ;
+#   - projection : recouvrement avec le parcours complet des features réduites, sans ACP
+def check_against_brute_force(index, data, n_queries=200, k=10, seed=0):
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(len(index), size=min(n_queries, len(index)), replace=False)
+    points = index.points
+    standardized = index.standardize(data.to_numpy()) if index.components is not None else None
+    exact, projection, tree_seconds, brute_seconds = [], [], 0.0, 0.0
+    for position in positions.tolist():
+        start = time.perf_counter()
+        distances, found = index.similar(position, k)
+        tree_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        squared = ((points - points[position]) ** 2).sum(axis=1)
+        squared[position] = np.inf
+        expected = np.argsort(squared, kind="stable")[:k]
+        brute_seconds += time.perf_counter() - start
+        # Égalités de distance : on compare les distances plutôt que les positions
+        exact.append(np.allclose(distances, np.sqrt(squared[expected]), rtol=1e-9, atol=1e-9))
+
+        if standardized is not None:
+            squared = ((standardized - standardized[position]) ** 2).sum(axis=1)
+            squared[position] = np.inf
+            projection.append(len(set(found.tolist()) & set(np.argpartition(squared, k)[:k].tolist())) / k)
+    return {
+        "queries": len(positions),
+        "k": k,
+        "exact": float(np.mean(exact)),
+        "projection_recall": float(np.mean(projection)) if projection else 1.0,
+        "tree_ms_per_query": 1000 * tree_seconds / len(positions),
+        "brute_force_ms_per_query": 1000 * brute_seconds / len(positions),
+    }
+
+
+if __name__ == '__main__':
+    from feature_store import data_version, load_features
+
+    parser = argparse.ArgumentParser(description="Construit l'index des clients similaires et le compare à la recherche exhaustive")
+    parser.add_argument("--components", type=int, default=config.SIMILAR_COMPONENTS, help="axes de l'ACP (0 = features réduites complètes)")
+    parser.add_argument("--check", type=int, default=200, help="nombre de clients comparés à la recherche exhaustive (0 = aucun)")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    data = load_features()
+    start = time.perf_counter()
+    index = load_neighbor_index(data, data_version(), args.components)
+    print(f"{index_path(index.version)}: {len(index)} clients, {index.points.shape[1]} dimensions "
+          f"({time.perf_counter() - start:.1f} s)")
+    if args.check:
+        report = check_against_brute_force(index, data, args.check, args.k)
+        print(f"requêtes exactes {report['exact']:.3f}, avec les features complètes {report['projection_recall']:.3f} ; "
+              f"{report['tree_ms_per_query']:.2f} ms par requête (exhaustif : {report['brute_force_ms_per_query']:.2f} ms)")
+        if report["exact"] < 1.0:
+            raise SystemExit("Index results differ from brute force")
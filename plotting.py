@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Graphiques des dashboards. matplotlib et shap ne sont importés qu'au premier
+# graphique demandé (bouton « Prédire »), et non à l'ouverture de chaque session,
+# avec le backend Agg qui ne nécessite pas d'affichage (serveur sans écran).
+
+_pyplot = None
+
+
+def pyplot():
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        plt.style.use('fivethirtyeight')
+        _pyplot = plt
+    return _pyplot
+
+
+# Figure du force plot SHAP d'un client, à afficher avec st.pyplot
+def force_plot_figure(expected_value, shap_values, features):
+    plt = pyplot()
+    import shap
+    plt.close("all")
+    shap.force_plot(expected_value, shap_values, features, matplotlib=True, show=False)
+    return plt.gcf()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Statistiques de population de X_test, calculées une fois par version du modèle et
+# des données pour situer un client par rapport à l'ensemble des clients et aux
+# groupes acceptés / refusés :
+#   - montants (revenu, crédit, annuité, prix des biens), âge (DAYS_BIRTH) et score ;
+#   - par groupe : résumé (effectif, moyenne, écart-type, extrêmes), centiles et
+#     histogramme sur des bornes communes aux trois groupes ;
+#   - les valeurs triées de chaque groupe sont conservées : le rang centile d'un
+#     client est une recherche dichotomique (O(log n)).
+
+import numpy as np
+
+AMOUNT_FEATURES = ("AMT_INCOME_TOTAL", "AMT_CREDIT", "AMT_ANNUITY", "AMT_GOODS_PRICE")
+GROUPS = ("all", "accepted", "denied")
+HISTOGRAM_BINS = 30
+QUANTILES = np.linspace(0, 1, 101)
+
+
+# Colonnes décrites, alignées sur les lignes de X_test (NaN si la valeur manque)
+def population_columns(raw_data, index, probabilities):
+    columns = {}
+    for name in AMOUNT_FEATURES:
+        if name in raw_data.columns:
+            columns[name] = raw_data[name].reindex(index).to_numpy(dtype=np.float64)
+    if "DAYS_BIRTH" in raw_data.columns:
+        columns["AGE"] = raw_data["DAYS_BIRTH"].reindex(index).to_numpy(dtype=np.float64) / -365
+    columns["SCORE"] = np.asarray(probabilities, dtype=np.float64)
+    return columns
+
+
+def _summary(values):
+    if not len(values):
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values[0]),
+        "median": float(np.median(values)),
+        "max": float(values[-1]),
+    }
+
+
+class PopulationStats:
+    def __init__(self, columns, denied, version):
+        self.columns = columns
+        self.denied = np.asarray(denied, dtype=bool)
+        self.version = version
+        masks = {"all": np.ones(len(self.denied), dtype=bool), "accepted": ~self.denied, "denied": self.denied}
+        # Valeurs triées (sans NaN) de chaque feature et de chaque groupe
+        self.sorted = {
+            name: {group: np.sort(values[mask & ~np.isnan(values)]) for group, mask in masks.items()}
+            for name, values in columns.items()
+        }
+        self.payload = self._payload()
+
+    def _payload(self):
+        features = {}
+        for name, groups in self.sorted.items():
+            edges = np.histogram_bin_edges(groups["all"], bins=HISTOGRAM_BINS) if len(groups["all"]) else np.empty(0)
+            features[name] = {
+                "missing": int(np.isnan(self.columns[name]).sum()),
+                "bin_edges": edges.tolist(),
+                "groups": {
+                    group: {
+                        **_summary(values),
+                        "quantiles": np.quantile(values, QUANTILES).tolist() if len(values) else [],
+                        "histogram": np.histogram(values, bins=edges)[0].tolist() if len(edges) else [],
+                    }
+                    for group, values in groups.items()
+                },
+            }
+        return {"version": self.version, "n_clients": len(self.denied), "quantiles": QUANTILES.tolist(), "features": features}
+
+    # Part (en %) des clients du groupe dont la valeur est inférieure ou égale à value
+    def percentile(self, name, value, group="all"):
+        values = self.sorted[name][group]
+        if np.isnan(value) or not len(values):
+            return None
+        return 100.0 * int(np.searchsorted(values, value, side="right")) / len(values)
+
+    # Valeurs et rangs centiles d'une ligne de X_test (par position)
+    def client(self, position):
+        features = {}
+        for name, values in self.columns.items():
+            value = float(values[position])
+            features[name] = {
+                "value": None if np.isnan(value) else value,
+                "percentiles": {group: self.percentile(name, value, group) for group in GROUPS},
+            }
+        return {"group": "denied" if self.denied[position] else "accepted", "features": features}
+
+
+# Statistiques de X_test à partir des probabilités déjà calculées (table des scores)
+def build_population_stats(raw_data, data, probabilities, threshold, version):
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    return PopulationStats(population_columns(raw_data, data.index, probabilities), probabilities >= threshold, version)
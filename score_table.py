@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Table des scores de toute la population de X_test, calculée une fois par paquets
+# vectorisés puis conservée sur disque. Le nom du fichier contient les empreintes du
+# modèle et des données : tout changement de l'un ou de l'autre invalide la table.
+# Les clients connus sont alors servis par simple lecture, le modèle n'étant appelé
+# que pour les lignes absentes de la table.
+#
+# Calcul hors ligne : python score_table.py
+
+import os
+import tempfile
+
+import numpy as np
+
+import config
+from artifacts import artifact_checksum, MODEL_ARTIFACT
+from feature_store import data_version
+from id_index import IdIndex
+
+
+class ScoreTable:
+    def __init__(self, ids, probabilities, threshold, version):
+        self.index = IdIndex(ids)
+        self.probabilities = probabilities
+        self.threshold = threshold
+        # True = crédit refusé
+        self.denied = probabilities >= threshold
+        self.version = version
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    # (probabilité, refus) du client, None s'il n'est pas dans la table
+    def lookup(self, client_id):
+        position = self.index.position(client_id)
+        if position is None:
+            return None
+        return float(self.probabilities[position]), bool(self.denied[position])
+
+
+def score_all(predict, X, chunk_size):
+    probabilities = np.empty(len(X), dtype=np.float64)
+    for start in range(0, len(X), chunk_size):
+        probabilities[start:start + chunk_size] = predict(X[start:start + chunk_size])
+    return probabilities
+
+
+def table_version(model_checksum, data_checksum):
+    return f"{model_checksum[:16]}-{data_checksum[:16]}"
+
+
+def table_path(version, table_dir=None):
+    return os.path.join(table_dir or config.SCORE_TABLE_DIR, f"scores-{version}.npz")
+
+
+# Charge la table correspondant à la version courante du modèle et des données,
+# ou la calcule et l'enregistre si elle n'existe pas encore
+def load_score_table(predict, data, threshold, chunk_size=5000, version=None, table_dir=None):
+    version = version or table_version(artifact_checksum(MODEL_ARTIFACT), data_version())
+    path = table_path(version, table_dir)
+    ids = data.index.to_numpy(dtype=np.int64)
+    if os.path.exists(path):
+        with np.load(path) as stored:
+            if np.array_equal(stored["ids"], ids):
+                return ScoreTable(ids, stored["probabilities"], threshold, version)
+
+    probabilities = score_all(predict, data.to_numpy(), chunk_size)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".npz")
+    with os.fdopen(fd, "wb") as f:
+        np.savez(f, ids=ids, probabilities=probabilities)
+    os.replace(tmp, path)
+    return ScoreTable(ids, probabilities, threshold, version)
+
+
+if __name__ == '__main__':
+    from feature_store import load_features
+    from model_registry import get_registry
+    from scoring import SEUIL
+    from tree_engine import make_predictor
+
+    model_version = get_registry().current()
+    table = load_score_table(make_predictor(model_version.model, config.INFERENCE_BACKEND), load_features(), threshold=SEUIL,
+                             version=table_version(model_version.checksum, data_version()))
+    print(f"{table_path(table.version)}: {len(table)} clients, {int(table.denied.sum())} refus")
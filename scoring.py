@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Règle de décision et accès au modèle, communs à l'API, aux dashboards et aux outils en ligne de commande.
+
+import config
+from model_registry import get_registry
+
+# Seuil de décision : au-delà, le crédit est refusé (SCORING_THRESHOLD, 0.435 par défaut)
+SEUIL = config.THRESHOLD
+
+
+def decision(proba):
+    return "Denied" if proba >= SEUIL else "Accepted"
+
+
+# Modèle courant du registre : chargé une fois par processus et par version
+def load_model():
+    return get_registry().get()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Sérialisation rapide des réponses de l'API.
+# Les lignes de données brutes sont lues colonne par colonne directement dans les
+# tableaux NumPy du DataFrame (vues, sans copie) et encodées par orjson, sans passer
+# par Series.to_dict() ni par le repli lent de jsonify sur les scalaires NumPy.
+# Les valeurs manquantes (NaN) sont encodées en null, ce qui garantit un JSON valide.
+# Formats binaires optionnels, négociés par l'en-tête Accept :
+#   application/x-msgpack                 (paquet msgpack)
+#   application/vnd.apache.arrow.stream   (flux Arrow IPC, pour les lignes de données)
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/x-msgpack"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+
+
+def _to_python(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, np.ndarray):
+        return [_to_python(v) for v in value.tolist()]
+    return value
+
+
+def _clean(obj):
+    # Repli sans orjson : NaN -> None et scalaires NumPy -> types Python, récursivement
+    if isinstance(obj, dict):
+        return {key: _clean(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_clean(value) for value in obj]
+    return _to_python(obj)
+
+
+def dumps_json(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_clean(obj), allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(obj):
+    return msgpack.packb(_clean(obj), use_bin_type=True)
+
+
+def available_mimetypes(tabular=False):
+    mimetypes = [JSON_MIMETYPE]
+    if msgpack is not None:
+        mimetypes.append(MSGPACK_MIMETYPE)
+    if tabular and pa is not None:
+        mimetypes.append(ARROW_MIMETYPE)
+    return mimetypes
+
+
+# Type de contenu retenu pour la requête (JSON par défaut)
+def negotiate(accept_mimetypes, tabular=False):
+    return accept_mimetypes.best_match(available_mimetypes(tabular), default=JSON_MIMETYPE)
+
+
+def encode(obj, mimetype=JSON_MIMETYPE):
+    if mimetype == MSGPACK_MIMETYPE:
+        return dumps_msgpack(obj)
+    return dumps_json(obj)
+
+
+class RowEncoder:
+    # Encodeur des lignes d'un DataFrame : noms de colonnes et tableaux par colonne
+    # préparés une seule fois, une ligne ne coûte ensuite qu'une lecture par colonne
+    def __init__(self, frame):
+        self.frame = frame
+        self.columns = [str(column) for column in frame.columns]
+        self._plain = []
+        self._categorical = []
+        for i, column in enumerate(frame.columns):
+            series = frame[column]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                categories = np.asarray(series.cat.categories, dtype=object)
+                self._categorical.append((i, series.cat.codes.to_numpy(), categories))
+            else:
+                self._plain.append((i, series.to_numpy()))
+        if orjson is None:
+            # Sans orjson, les clés JSON sont encodées une fois pour toutes
+            self._keys = [json.dumps(column) + ":" for column in self.columns]
+
+    def values(self, position):
+        values = [None] * len(self.columns)
+        for i, array in self._plain:
+            values[i] = array[position]
+        for i, codes, categories in self._categorical:
+            code = codes[position]
+            values[i] = categories[code] if code >= 0 else None
+        return values
+
+    def row(self, position):
+        return dict(zip(self.columns, self.values(position)))
+
+    def encode(self, position, mimetype=JSON_MIMETYPE):
+        if mimetype == ARROW_MIMETYPE:
+            return self.encode_arrow(position)
+        if mimetype == MSGPACK_MIMETYPE:
+            return dumps_msgpack(self.row(position))
+        if orjson is not None:
+            return orjson.dumps(self.row(position), option=orjson.OPT_SERIALIZE_NUMPY)
+        parts = [key + json.dumps(_to_python(value), allow_nan=False) for key, value in zip(self._keys, self.values(position))]
+        return ("{" + ",".join(parts) + "}").encode("utf-8")
+
+    def encode_arrow(self, position):
+        table = pa.Table.from_pandas(self.frame.iloc[[position]], preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
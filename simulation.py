@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Simulation de la règle de décision :
+#   - balayage d'une grille de seuils sur des scores déjà calculés : taux
+#     d'acceptation, matrice de confusion par rapport à TARGET, coût métier et
+#     défauts attendus parmi les acceptés. Les scores sont triés une fois ; chaque
+#     seuil ne coûte ensuite qu'une recherche dichotomique (searchsorted) ;
+#   - variantes « et si » : modifications de features appliquées à un client ou à
+#     une cohorte, toutes les variantes étant évaluées en un seul appel groupé au modèle.
+# Convention : crédit refusé si probabilité >= seuil ; un défaut (TARGET = 1) accepté
+# est un faux négatif, un bon client refusé un faux positif.
+
+import numpy as np
+
+import config
+
+OPERATIONS = ("set", "add", "multiply")
+
+
+def threshold_grid(start=0.0, stop=1.0, num=101):
+    return np.linspace(start, stop, num)
+
+
+class ThresholdSweep:
+    def __init__(self, probabilities, targets):
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        targets = np.asarray(targets, dtype=np.float64)
+        labelled = ~np.isnan(targets)
+        self.n = len(probabilities)
+        self.sorted = np.sort(probabilities)
+        # Somme cumulée des probabilités triées : défauts attendus sous chaque seuil
+        self.cumulative = np.concatenate([[0.0], np.cumsum(self.sorted)])
+        self.defaults = np.sort(probabilities[labelled & (targets == 1)])
+        self.non_defaults = np.sort(probabilities[labelled & (targets == 0)])
+
+    def __call__(self, thresholds, cost_false_negative=None, cost_false_positive=None):
+        cost_false_negative = config.COST_FALSE_NEGATIVE if cost_false_negative is None else cost_false_negative
+        cost_false_positive = config.COST_FALSE_POSITIVE if cost_false_positive is None else cost_false_positive
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        # Acceptés = probabilité < seuil
+        accepted = np.searchsorted(self.sorted, thresholds, side="left")
+        false_negative = np.searchsorted(self.defaults, thresholds, side="left")
+        true_negative = np.searchsorted(self.non_defaults, thresholds, side="left")
+        true_positive = len(self.defaults) - false_negative
+        false_positive = len(self.non_defaults) - true_negative
+        return {
+            "thresholds": thresholds.tolist(),
+            "n": self.n,
+            "n_labelled": len(self.defaults) + len(self.non_defaults),
+            "accepted": accepted.tolist(),
+            "denied": (self.n - accepted).tolist(),
+            "approval_rate": (accepted / self.n if self.n else np.zeros(len(thresholds))).tolist(),
+            "expected_defaults_accepted": self.cumulative[accepted].tolist(),
+            "true_positive": true_positive.tolist(),
+            "false_positive": false_positive.tolist(),
+            "true_negative": true_negative.tolist(),
+            "false_negative": false_negative.tolist(),
+            "cost": (cost_false_negative * false_negative + cost_false_positive * false_positive).tolist(),
+        }
+
+
+# Vérifie une variante {feature: {opération: valeur}} et la convertit en
+# liste (indice de colonne, opération, valeur)
+def parse_perturbation(perturbation, columns):
+    if not isinstance(perturbation, dict) or not perturbation:
+        raise ValueError("A perturbation must be a non-empty object {feature: {operation: value}}")
+    positions = {column: i for i, column in enumerate(columns)}
+    changes = []
+    for feature, change in perturbation.items():
+        if feature not in positions:
+            raise ValueError(f"Unknown feature: {feature}")
+        if not isinstance(change, dict) or len(change) != 1:
+            raise ValueError(f"'{feature}' must map to exactly one of {list(OPERATIONS)}")
+        operation, value = next(iter(change.items()))
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{operation}' (expected one of {list(OPERATIONS)})")
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"Value of '{feature}' must be a number")
+        changes.append((positions[feature], operation, float(value)))
+    return changes
+
+
+# Matrice de toutes les variantes : len(variants) blocs de lignes de base modifiées
+def apply_perturbations(base, variants):
+    block = len(base)
+    X = np.tile(np.asarray(base, dtype=np.float64), (len(variants), 1))
+    for v, changes in enumerate(variants):
+        rows = slice(v * block, (v + 1) * block)
+        for column, operation, value in changes:
+            if operation == "set":
+                X[rows, column] = value
+            elif operation == "add":
+                X[rows, column] += value
+            else:
+                X[rows, column] *= value
+    return X
+
+
+# Scores de toutes les variantes en un seul appel groupé, un tableau par variante
+def score_variants(predict, base, variants):
+    if not variants:
+        return []
+    probabilities = predict(apply_perturbations(base, variants))
+    return np.split(np.asarray(probabilities, dtype=np.float64), len(variants))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Index des clients similaires comparé à la recherche exhaustive, sur des données
+# synthétiques (valeurs continues, donc sans égalité de distance).
+# Sans ACP (n_components=0), le BallTree doit renvoyer exactement les voisins du
+# parcours complet des features réduites. Avec l'ACP, la recherche reste exacte dans
+# l'espace projeté, mais les voisins ne sont qu'approchés dans l'espace complet : on
+# exige seulement un recouvrement d'au moins 90 % (RECALL_WITH_PCA) sur des données
+# sans valeur manquante dont la variance est concentrée sur les axes conservés. Sur
+# des données quelconques, le recouvrement dépend de la part de variance expliquée
+# et n'est pas garanti.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("sklearn")
+
+from neighbors import build_index, check_against_brute_force, load_neighbor_index
+
+N_ROWS = 1500
+N_FEATURES = 20
+K = 10
+RECALL_WITH_PCA = 0.9
+
+
+def make_data(latent=None, seed=0):
+    rng = np.random.default_rng(seed)
+    if latent:
+        # Variance concentrée sur `latent` directions, plus un bruit faible
+        X = rng.normal(size=(N_ROWS, latent)) @ rng.normal(size=(latent, N_FEATURES))
+        X += 0.01 * rng.normal(size=X.shape)
+    else:
+        X = rng.normal(size=(N_ROWS, N_FEATURES)) * rng.uniform(0.1, 100, N_FEATURES)
+        X[rng.random(X.shape) < 0.05] = np.nan
+    ids = pd.Index(np.arange(100001, 100001 + N_ROWS, dtype=np.int64), name="SK_ID_CURR")
+    return pd.DataFrame(X, index=ids, columns=[f"FEATURE_{i}" for i in range(N_FEATURES)])
+
+
+# Identifiants des k plus proches lignes de standardized[position], elle-même exclue
+def brute_force_ids(data, standardized, position, k):
+    squared = ((standardized - standardized[position]) ** 2).sum(axis=1)
+    squared[position] = np.inf
+    return data.index.to_numpy()[np.argsort(squared)[:k]]
+
+
+def test_similar_matches_brute_force_without_pca():
+    data = make_data()
+    index = build_index(data, "test", n_components=0)
+    assert index.components is None
+    standardized = index.standardize(data.to_numpy())
+    for position in range(0, N_ROWS, 50):
+        _, positions = index.similar(position, K)
+        assert index.ids[positions].tolist() == brute_force_ids(data, standardized, position, K).tolist()
+
+
+def test_query_matches_brute_force_without_pca():
+    data = make_data()
+    index = build_index(data, "test", n_components=0)
+    queries = make_data(seed=1).to_numpy()[:20]
+    standardized = index.standardize(data.to_numpy())
+    _, positions = index.query(queries, K)
+    for row, found in zip(index.standardize(queries), positions):
+        expected = np.argsort(((standardized - row) ** 2).sum(axis=1))[:K]
+        assert found.tolist() == expected.tolist()
+
+
+def test_pca_is_exact_in_projected_space_and_close_in_full_space():
+    data = make_data(latent=5)
+    index = build_index(data, "test", n_components=5)
+    assert index.points.shape == (N_ROWS, 5)
+    report = check_against_brute_force(index, data, n_queries=100, k=K)
+    assert report["exact"] == 1.0
+    assert report["projection_recall"] >= RECALL_WITH_PCA
+
+
+def test_build_index_leaves_data_unchanged():
+    data = make_data()
+    before = data.to_numpy().copy()
+    build_index(data, "test", n_components=0)
+    build_index(data, "test", n_components=5)
+    assert np.array_equal(data.to_numpy(), before, equal_nan=True)
+
+
+def test_build_index_accepts_read_only_features():
+    data = make_data()
+    matrix = data.to_numpy().copy()
+    matrix.flags.writeable = False
+    read_only = pd.DataFrame(matrix, index=data.index, columns=data.columns, copy=False)
+    index = build_index(read_only, "test", n_components=0)
+    assert len(index) == N_ROWS
+
+
+def test_load_neighbor_index_reuses_saved_index(tmp_path):
+    data = make_data()
+    index = load_neighbor_index(data, "0" * 64, n_components=0, index_dir=str(tmp_path))
+    reloaded = load_neighbor_index(data, "0" * 64, n_components=0, index_dir=str(tmp_path))
+    assert reloaded.version == index.version
+    assert np.array_equal(reloaded.points, index.points)
+    assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Parité des moteurs "booster" et "compiled" avec predict_proba, sur un modèle
+# LightGBM de substitution (comme benchmarks/bench_api.py) entraîné sur des données
+# synthétiques comprenant valeurs manquantes, zéros et features entières.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+lightgbm = pytest.importorskip("lightgbm")
+
+from tree_engine import CompiledTrees, make_predictor
+
+N_ROWS = 2000
+N_FEATURES = 8
+
+
+def make_data(seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(N_ROWS, N_FEATURES))
+    # Valeurs manquantes à l'entraînement (missing_type NaN)
+    X[rng.random(N_ROWS) < 0.2, 0] = np.nan
+    # Feature majoritairement nulle
+    X[rng.random(N_ROWS) < 0.6, 1] = 0.0
+    # Feature entière à peu de modalités : des lignes tombent exactement sur les seuils
+    X[:, 2] = rng.integers(0, 5, N_ROWS)
+    logit = X[:, 1] + 0.8 * X[:, 2] - np.nan_to_num(X[:, 0]) + 0.5 * X[:, 3]
+    y = (rng.random(N_ROWS) < 1 / (1 + np.exp(-logit + 2))).astype(int)
+    columns = [f"FEATURE_{i}" for i in range(N_FEATURES)]
+    return pd.DataFrame(X, columns=columns), y
+
+
+def fit(X, y, categorical_feature="auto", **params):
+    model = lightgbm.LGBMClassifier(n_estimators=30, num_leaves=15, min_child_samples=5,
+                                    random_state=0, verbose=-1, **params)
+    model.fit(X, y, categorical_feature=categorical_feature)
+    return model
+
+
+# Lignes de test : données d'origine, NaN sur des features sans valeur manquante à
+# l'entraînement (missing_type None), zéros, et valeurs égales aux seuils appris
+def edge_rows(model, X):
+    rng = np.random.default_rng(1)
+    rows = [X.to_numpy()[:300]]
+    nan_rows = X.to_numpy()[:50].copy()
+    nan_rows[rng.random(nan_rows.shape) < 0.3] = np.nan
+    rows.append(nan_rows)
+    rows.append(np.zeros((1, N_FEATURES)))
+    trees = CompiledTrees(model.booster_)
+    on_threshold = np.repeat(X.to_numpy()[:1], len(trees.threshold), axis=0)
+    on_threshold[np.arange(len(trees.threshold)), trees.split_feature] = trees.threshold
+    rows.append(on_threshold)
+    return np.vstack(rows)
+
+
+@pytest.mark.parametrize("params", [{}, {"zero_as_missing": True}, {"use_missing": False}],
+                         ids=["default", "zero_as_missing", "no_missing"])
+@pytest.mark.parametrize("backend", ["booster", "compiled"])
+def test_backend_matches_predict_proba(backend, params):
+    X, y = make_data()
+    model = fit(X, y, **params)
+    rows = edge_rows(model, X)
+    expected = model.predict_proba(rows)[:, 1]
+    assert np.allclose(make_predictor(model, backend)(rows), expected, rtol=0, atol=1e-9)
+
+
+def test_compiled_single_row():
+    X, y = make_data()
+    model = fit(X, y)
+    row = X.to_numpy()[0]
+    assert np.allclose(CompiledTrees(model.booster_).predict(row), model.predict_proba(row.reshape(1, -1))[:, 1])
+
+
+def test_compiled_rejects_categorical_splits():
+    X, y = make_data()
+    X["FEATURE_2"] = X["FEATURE_2"].astype(int)
+    model = fit(X, y, categorical_feature=[2])
+    with pytest.raises(ValueError, match="Categorical"):
+        CompiledTrees(model.booster_)
+    # Le moteur natif reste utilisable
+    rows = X.to_numpy()[:100]
+    assert np.allclose(make_predictor(model, "booster")(rows), model.predict_proba(rows)[:, 1])
+
+
+def test_compiled_rejects_wrong_width():
+    X, y = make_data()
+    model = fit(X, y)
+    with pytest.raises(ValueError, match="Expected"):
+        CompiledTrees(model.booster_).predict(np.zeros((1, N_FEATURES + 1)))
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Moteurs d'inférence pour le modèle LightGBM.
+# Sur une seule ligne, l'essentiel du temps de predict_proba est passé dans la
+# validation du wrapper sklearn, pas dans le parcours des arbres. Deux alternatives :
+#   - "booster"  : appel direct au prédicteur natif de LightGBM (model.booster_) ;
+#   - "compiled" : arbres exportés en tableaux NumPy plats (feature, seuil, fils,
+#                  valeurs des feuilles) et parcourus de façon vectorisée sur
+#                  toutes les lignes et tous les arbres à la fois.
+# Toutes renvoient la probabilité de la classe positive, identique à predict_proba.
+#
+# Contrôle de parité et comparaison des latences : python tree_engine.py
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+import config
+
+BACKENDS = ("sklearn", "booster", "compiled")
+
+# Codage des valeurs manquantes, comme dans LightGBM (MissingType)
+MISSING_NONE, MISSING_ZERO, MISSING_NAN = 0, 1, 2
+MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+# Seuil sous lequel LightGBM considère une valeur comme nulle (kZeroThreshold, littéral
+# float 1e-35f : sa valeur double, et non 1e-35, est celle des seuils exportés)
+ZERO_THRESHOLD = float(np.float32(1e-35))
+
+
+class CompiledTrees:
+    # Les noeuds internes de tous les arbres sont concaténés dans des tableaux communs.
+    # Un fils >= 0 désigne un noeud interne, un fils < 0 la feuille d'indice ~fils.
+    def __init__(self, booster):
+        dump = booster.dump_model()
+        if dump.get("num_class", 1) != 1:
+            raise ValueError("Only binary models are supported")
+        objective = dump.get("objective", "")
+        if not objective.startswith("binary"):
+            raise ValueError(f"Unsupported objective: {objective}")
+        self.sigmoid = 1.0
+        for token in objective.split():
+            if token.startswith("sigmoid:"):
+                self.sigmoid = float(token.split(":", 1)[1])
+        self.average_output = bool(dump.get("average_output", False))
+        self.n_features = dump["max_feature_idx"] + 1
+
+        split_feature, threshold, default_left, missing_type = [], [], [], []
+        left_child, right_child, leaf_value, roots = [], [], [], []
+
+        def add(node):
+            if "leaf_value" in node or "split_index" not in node:
+                if "leaf_coeff" in node:
+                    raise ValueError("Linear trees are not supported")
+                leaf_value.append(node.get("leaf_value", 0.0))
+                return ~(len(leaf_value) - 1)
+            if node["decision_type"] != "<=":
+                raise ValueError("Categorical splits are not supported")
+            index = len(split_feature)
+            split_feature.append(node["split_feature"])
+            threshold.append(node["threshold"])
+            default_left.append(node["default_left"])
+            missing_type.append(MISSING_TYPES[node["missing_type"]])
+            left_child.append(0)
+            right_child.append(0)
+            left_child[index] = add(node["left_child"])
+            right_child[index] = add(node["right_child"])
+            return index
+
+        for tree in dump["tree_info"]:
+            roots.append(add(tree["tree_structure"]))
+
+        self.split_feature = np.asarray(split_feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.missing_type = np.asarray(missing_type, dtype=np.int8)
+        self.left_child = np.asarray(left_child, dtype=np.int32)
+        self.right_child = np.asarray(right_child, dtype=np.int32)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.int32)
+
+    def raw_score(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        # Noeud courant de chaque (ligne, arbre) ; une itération par niveau de profondeur
+        node = np.repeat(self.roots[np.newaxis, :], len(X), axis=0)
+        rows, trees = np.nonzero(node >= 0)
+        while len(rows):
+            current = node[rows, trees]
+            fval = X[rows, self.split_feature[current]]
+            missing = self.missing_type[current]
+            is_nan = np.isnan(fval)
+            # Même règle que Tree::NumericalDecision de LightGBM
+            fval = np.where(is_nan & (missing != MISSING_NAN), 0.0, fval)
+            is_missing = ((missing == MISSING_ZERO) & (np.abs(fval) <= ZERO_THRESHOLD)) | ((missing == MISSING_NAN) & is_nan)
+            go_left = np.where(is_missing, self.default_left[current], fval <= self.threshold[current])
+            child = np.where(go_left, self.left_child[current], self.right_child[current])
+            node[rows, trees] = child
+            internal = child >= 0
+            rows, trees = rows[internal], trees[internal]
+        score = self.leaf_value[~node].sum(axis=1)
+        if self.average_output:
+            score /= len(self.roots)
+        return score
+
+    def predict(self, X):
+        return 1.0 / (1.0 + np.exp(-self.sigmoid * self.raw_score(X)))
+
+
+# Renvoie une fonction X -> probabilité de la classe positive (tableau 1D).
+# num_threads : threads OpenMP de LightGBM (0 = réglage du modèle) ; il prime sur le
+# n_jobs enregistré avec le modèle, qui sinon fixe lui-même le nombre de threads
+def make_predictor(model, backend="sklearn", num_threads=None):
+    num_threads = config.PREDICT_THREADS if num_threads is None else num_threads
+    params = {"num_threads": num_threads} if num_threads else {}
+    if backend == "sklearn":
+        return lambda X: model.predict_proba(X, **params)[:, 1]
+    if backend == "booster":
+        booster = model.booster_
+        return lambda X: booster.predict(np.asarray(X).reshape(-1, booster.num_feature()), **params)
+    if backend == "compiled":
+        return CompiledTrees(model.booster_).predict
+    raise ValueError(f"Unknown inference backend {backend!r}, expected one of {BACKENDS}")
+
+
+def _percentile_ms(timings, q):
+    return float(np.percentile(timings, q) * 1000)
+
+
+# Compare les probabilités de chaque moteur à predict_proba et mesure leurs latences
+def compare_backends(model, X, n_single=200, tolerance=1e-9):
+    reference = model.predict_proba(X)[:, 1]
+    report = {}
+    for backend in BACKENDS:
+        predictor = make_predictor(model, backend)
+        probas = predictor(X)
+        start = time.perf_counter()
+        predictor(X)
+        batch_seconds = time.perf_counter() - start
+        timings = []
+        for row in X[:n_single]:
+            start = time.perf_counter()
+            predictor(row.reshape(1, -1))
+            timings.append(time.perf_counter() - start)
+        max_abs_diff = float(np.max(np.abs(probas - reference))) if len(X) else 0.0
+        report[backend] = {
+            "max_abs_diff": max_abs_diff,
+            "parity": max_abs_diff <= tolerance,
+            "single_row_p50_ms": _percentile_ms(timings, 50),
+            "single_row_p95_ms": _percentile_ms(timings, 95),
+            "batch_rows_per_s": len(X) / batch_seconds if batch_seconds else math.inf,
+        }
+    return report
+
+
+if __name__ == '__main__':
+    from feature_store import load_features
+    from scoring import load_model
+
+    parser = argparse.ArgumentParser(description="Parité et latence des moteurs d'inférence")
+    parser.add_argument("--rows", type=int, default=5000, help="nombre de lignes de X_test utilisées")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    model = load_model()
+    X = load_features().to_numpy()[:args.rows]
+    report = compare_backends(model, X, tolerance=args.tolerance)
+    for backend, result in report.items():
+        print(f"{backend:9s} parité={'OK' if result['parity'] else 'ÉCHEC'} "
+              f"écart max={result['max_abs_diff']:.2e} "
+              f"p50={result['single_row_p50_ms']:.3f} ms p95={result['single_row_p95_ms']:.3f} ms "
+              f"lot={result['batch_rows_per_s']:.0f} lignes/s")
+    if not all(result["parity"] for result in report.values()):
+        raise SystemExit(1)
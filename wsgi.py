@@ -0,0 +1,8 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Point d'entrée WSGI de l'API : gunicorn -c gunicorn.conf.py wsgi:app
+
+from api import create_app
+
+app = create_app()